@@ -0,0 +1,191 @@
+import asyncio
+import bisect
+import itertools
+import logging
+import os
+import time
+import weakref
+from typing import Any
+
+import mcp.types as types
+from mcp.server.lowlevel.server import request_ctx
+from mcp.shared.exceptions import McpError
+
+logger = logging.getLogger(__name__)
+
+# Admission control for the server
+# Every tool call, resource read and prompt request goes through:
+#   1. a per-client token bucket (MCP_RATE_LIMIT requests/s, bursts up to MCP_RATE_BURST)
+#   2. a global concurrency limit (MCP_MAX_CONCURRENCY) and per-tool caps (MCP_TOOL_CONCURRENCY, e.g. "create_thumbnail=4")
+#   3. a bounded wait queue (MCP_MAX_QUEUE entries, MCP_QUEUE_TIMEOUT seconds) where cheap requests go before
+#      the expensive tools (MCP_EXPENSIVE_TOOLS)
+# Requests that cannot be admitted fail fast with a JSON-RPC error carrying retry_after (seconds) in its data.
+MAX_CONCURRENCY = int(os.environ.get("MCP_MAX_CONCURRENCY", "32"))
+MAX_QUEUE = int(os.environ.get("MCP_MAX_QUEUE", "64"))
+QUEUE_TIMEOUT = float(os.environ.get("MCP_QUEUE_TIMEOUT", "10"))
+RATE_LIMIT = float(os.environ.get("MCP_RATE_LIMIT", "20"))
+RATE_BURST = float(os.environ.get("MCP_RATE_BURST", "40"))
+EXPENSIVE_TOOLS = os.environ.get("MCP_EXPENSIVE_TOOLS", "create_thumbnail,summarize_document,generate_poem,get_forecast_stats")
+TOOL_CONCURRENCY = os.environ.get("MCP_TOOL_CONCURRENCY", "create_thumbnail=4,summarize_document=4,generate_poem=4,get_forecast_stats=4")
+
+# JSON-RPC server error code for rejected requests
+SERVER_BUSY = -32000
+CHEAP, EXPENSIVE = 0, 1
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def try_acquire(self) -> float:
+        """Take a token, returns 0 on success or the seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+def busy_error(message: str, retry_after: float) -> McpError:
+    retry_after = round(max(retry_after, 0.1), 2)
+    return McpError(types.ErrorData(code=SERVER_BUSY, message=f"{message}, retry after {retry_after}s",
+                                    data={"retry_after": retry_after}))
+
+
+class AdmissionController:
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY, max_queue: int = MAX_QUEUE,
+                 queue_timeout: float = QUEUE_TIMEOUT, rate_limit: float = RATE_LIMIT, rate_burst: float = RATE_BURST,
+                 expensive_tools: str = EXPENSIVE_TOOLS, tool_concurrency: str = TOOL_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.rate_limit = rate_limit
+        self.rate_burst = rate_burst
+        self.expensive_tools = {name.strip() for name in expensive_tools.split(",") if name.strip()}
+        self.tool_limits = {
+            name.strip(): int(limit)
+            for name, limit in (item.split("=", 1) for item in tool_concurrency.split(",") if "=" in item)
+        }
+        self.running = 0
+        self.running_per_tool: dict[str, int] = {}
+        # Sorted by (priority, arrival), entries are [priority, sequence, tool, future]
+        self._waiting: list[list[Any]] = []
+        self._sequence = itertools.count()
+        # One bucket per client session, dropped together with the session
+        self._buckets: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self.admitted = 0
+        self.rejected = {"rate_limited": 0, "queue_full": 0, "queue_timeout": 0}
+        self._service_time = 0.1
+
+    def _can_run(self, tool: str | None) -> bool:
+        if self.running >= self.max_concurrency:
+            return False
+        limit = self.tool_limits.get(tool) if tool else None
+        return limit is None or self.running_per_tool.get(tool, 0) < limit
+
+    def _start(self, tool: str | None):
+        self.running += 1
+        if tool:
+            self.running_per_tool[tool] = self.running_per_tool.get(tool, 0) + 1
+
+    def _dispatch(self):
+        # Start waiters in priority order, skipping the ones held back by their tool's cap
+        index = 0
+        while index < len(self._waiting) and self.running < self.max_concurrency:
+            _, _, tool, future = self._waiting[index]
+            if future.done() or not self._can_run(tool):
+                index += 1
+                continue
+            del self._waiting[index]
+            self._start(tool)
+            future.set_result(None)
+
+    def _retry_after(self) -> float:
+        # Time for the queue ahead to drain at the observed service time
+        return self._service_time * (len(self._waiting) + 1) / max(self.max_concurrency, 1)
+
+    def _check_rate(self, client):
+        if not self.rate_limit or client is None:
+            return
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = TokenBucket(self.rate_limit, self.rate_burst)
+        wait = bucket.try_acquire()
+        if wait:
+            self.rejected["rate_limited"] += 1
+            raise busy_error("Rate limit exceeded", wait)
+
+    async def acquire(self, client, tool: str | None):
+        """Wait for a slot (tool is None for resources and prompts), raises McpError when it cannot be admitted."""
+        self._check_rate(client)
+        if not self._waiting and self._can_run(tool):
+            self._start(tool)
+            self.admitted += 1
+            return
+        if len(self._waiting) >= self.max_queue:
+            self.rejected["queue_full"] += 1
+            logger.info("Rejected %s, queue full (%d waiting)", tool or "request", len(self._waiting))
+            raise busy_error("Server busy", self._retry_after())
+
+        priority = EXPENSIVE if tool in self.expensive_tools else CHEAP
+        future = asyncio.get_running_loop().create_future()
+        entry = [priority, next(self._sequence), tool, future]
+        bisect.insort(self._waiting, entry, key=lambda waiter: (waiter[0], waiter[1]))
+        # A cheap request may be startable even if an expensive one ahead of it is capped
+        self._dispatch()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # Got the slot just as we gave up, hand it on
+                self.release(tool, 0.0)
+            else:
+                future.cancel()
+                if entry in self._waiting:
+                    self._waiting.remove(entry)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.rejected["queue_timeout"] += 1
+            raise busy_error("Server busy", self._retry_after())
+        self.admitted += 1
+
+    def release(self, tool: str | None, service_time: float):
+        self.running -= 1
+        if tool:
+            self.running_per_tool[tool] -= 1
+        if service_time:
+            # Moving average of the service time, used for the retry_after hints
+            self._service_time = 0.9 * self._service_time + 0.1 * service_time
+        self._dispatch()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "running": self.running,
+            "queue_depth": len(self._waiting),
+            "admitted": self.admitted,
+            **{f"rejected_{reason}": count for reason, count in self.rejected.items()},
+            "running_per_tool": {tool: count for tool, count in self.running_per_tool.items() if count},
+        }
+
+
+def admission_layer(server, controller: AdmissionController):
+    """Request handler layer (see request_handlers.py) putting the tool, resource and prompt requests of a FastMCP
+    server behind admission control."""
+
+    async def admitted(req, handler):
+        is_tool = isinstance(req, types.CallToolRequest)
+        # Names come from the client, ones the server does not have must not add a running_per_tool entry each
+        tool = req.params.name if is_tool and server._tool_manager.has_tool(req.params.name) else None
+        await controller.acquire(request_ctx.get().session, tool)
+        start = time.perf_counter()
+        try:
+            return await handler(req)
+        finally:
+            controller.release(tool, time.perf_counter() - start)
+
+    return admitted
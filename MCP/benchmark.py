@@ -0,0 +1,318 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+import uvicorn
+from fastmcp import Client
+from fastmcp.client.transports import PythonStdioTransport
+
+import nws_stub
+
+# End-to-end load and latency benchmark
+# Drives server.py's tools, resources and prompts through the in-memory, stdio and SSE transports
+# against the local NWS stub (nws_stub.py) and a fake sampling handler, with concurrent sessions.
+# Reports throughput and p50/p95/p99 latency per operation and transport, --output writes them as JSON.
+#
+#   uv run python benchmark.py --transports memory,stdio,sse --sessions 8 --requests 50 --output bench.json
+# --startup N measures cold starts instead: module import times and stdio sessions (one server process each),
+# with and without MCP_PREWARM
+SERVER_SCRIPT = Path(__file__).parent / "server.py"
+IMAGE_PATH = str(Path(__file__).parent / "images" / "dog.png")
+TRANSPORTS = ["memory", "stdio", "sse"]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1.0).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"Nothing listening on port {port}")
+
+
+def start_nws_stub(latency_ms: float, jitter_ms: float, error_rate: float) -> str:
+    """Run the NWS stub in a background thread, returns its base url."""
+    port = free_port()
+    config = uvicorn.Config(nws_stub.create_app(latency_ms, jitter_ms, error_rate),
+                            host="127.0.0.1", port=port, log_level="warning")
+    threading.Thread(target=uvicorn.Server(config).run, daemon=True).start()
+    wait_for_port(port)
+    return f"http://127.0.0.1:{port}"
+
+
+def make_sampling_handler(latency_ms: float):
+    async def sampling_handler(messages, params, context) -> str:
+        # Stands in for the LLM, answers after a fixed delay
+        await asyncio.sleep(latency_ms / 1000)
+        return "A short generated answer from the fake sampling handler."
+    return sampling_handler
+
+
+# Operation name -> call, arguments vary with the iteration so the server caches see a realistic mix
+OPERATIONS: dict[str, Callable[[Client, int, int], Awaitable[Any]]] = {
+    "tool:get_forecast": lambda client, i, locations: client.call_tool(
+        "get_forecast", {"latitude": 47.0 + (i % locations) / 100, "longitude": -122.0}),
+    "tool:get_alerts": lambda client, i, locations: client.call_tool(
+        "get_alerts", {"state": ["WA", "CA", "NY", "TX", "FL"][i % 5]}),
+    "tool:get_forecast_stats": lambda client, i, locations: client.call_tool(
+        "get_forecast_stats", {"locations": [[47.0 + ((i + n) % locations) / 100, -122.0] for n in range(5)]}),
+    "tool:create_thumbnail": lambda client, i, locations: client.call_tool(
+        "create_thumbnail", {"image_path": IMAGE_PATH}),
+    "tool:generate_poem": lambda client, i, locations: client.call_tool(
+        "generate_poem", {"topic": "benchmarks"}),
+    "tool:summarize_document": lambda client, i, locations: client.call_tool(
+        "summarize_document", {"document_uri": "mcp://overview"}),
+    "resource:animal": lambda client, i, locations: client.read_resource("animal://lion"),
+    "resource:system_status": lambda client, i, locations: client.read_resource("system://status"),
+    "prompt:debug_session_start": lambda client, i, locations: client.get_prompt(
+        "debug_session_start", {"error_message": "IndentationError: expected an indented block"}),
+}
+
+# The weather tools report NWS failures in their result text instead of raising
+TOOL_ERROR_TEXT = "Unable to fetch"
+
+
+def is_error_result(result: Any) -> bool:
+    """isError results and tool output carrying an NWS failure, both count as errors."""
+    if getattr(result, "isError", False):
+        return True
+    contents = result if isinstance(result, list) else getattr(result, "content", [])
+    return any(TOOL_ERROR_TEXT in (getattr(content, "text", None) or "") for content in contents)
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Nearest rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(q * len(sorted_values)) - 1)]
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict[str, Any]:
+    latencies = sorted(latencies)
+    return {
+        "count": len(latencies),
+        "errors": errors,
+        "throughput_per_s": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(1000 * sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        "p50_ms": round(1000 * percentile(latencies, 0.50), 3),
+        "p95_ms": round(1000 * percentile(latencies, 0.95), 3),
+        "p99_ms": round(1000 * percentile(latencies, 0.99), 3),
+        "max_ms": round(1000 * latencies[-1], 3) if latencies else 0.0,
+    }
+
+
+class TransportRunner:
+    """Creates clients for one transport, starting and stopping the server process it needs."""
+
+    def __init__(self, transport: str, env: dict[str, str]):
+        self.transport = transport
+        self.env = env
+        self._process: subprocess.Popen | None = None
+        self._url = None
+
+    def __enter__(self):
+        if self.transport == "sse":
+            port = free_port()
+            self._process = subprocess.Popen(
+                [sys.executable, str(SERVER_SCRIPT), "--port", str(port)],
+                env=self.env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            wait_for_port(port)
+            self._url = f"http://127.0.0.1:{port}/sse"
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._process is not None:
+            self._process.terminate()
+            try:
+                self._process.wait(10)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+
+    def client(self, sampling_handler) -> Client:
+        if self.transport == "memory":
+            # Imported here so it picks up NWS_API_BASE from the environment
+            import server
+            target = server.mcp
+        elif self.transport == "stdio":
+            target = PythonStdioTransport(SERVER_SCRIPT, args=["--transport", "stdio"], env=self.env)
+        else:
+            target = self._url
+        return Client(target, sampling_handler=sampling_handler)
+
+
+async def run_session(client: Client, operations: list[str], requests: int, locations: int, offset: int,
+                      results: dict[str, tuple[list[float], list[int]]]):
+    async with client:
+        for i in range(requests):
+            name = operations[(offset + i) % len(operations)]
+            latencies, errors = results[name]
+            start = time.perf_counter()
+            try:
+                result = await OPERATIONS[name](client, offset + i, locations)
+            except Exception:
+                # fastmcp's Client raises ClientError on isError results
+                errors[0] += 1
+                continue
+            if is_error_result(result):
+                errors[0] += 1
+            else:
+                latencies.append(time.perf_counter() - start)
+
+
+async def run_transport(runner: TransportRunner, args, operations: list[str]) -> dict[str, Any]:
+    sampling_handler = make_sampling_handler(args.sampling_latency_ms)
+    # Warm up (imports, connections, caches of the first requests) outside of the measurement
+    await run_session(runner.client(sampling_handler), operations, len(operations), args.locations, 0,
+                      {name: ([], [0]) for name in operations})
+
+    results = {name: ([], [0]) for name in operations}
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        run_session(runner.client(sampling_handler), operations, args.requests, args.locations,
+                    session * args.requests, results)
+        for session in range(args.sessions)
+    ))
+    elapsed = time.perf_counter() - start
+
+    all_latencies = [latency for latencies, _ in results.values() for latency in latencies]
+    all_errors = sum(errors[0] for _, errors in results.values())
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "total": summarize(all_latencies, all_errors, elapsed),
+        "operations": {name: summarize(latencies, errors[0], elapsed) for name, (latencies, errors) in results.items()},
+    }
+
+
+def measure_import(module: str, env: dict[str, str]) -> float:
+    """Seconds the import of module takes in a fresh interpreter."""
+    code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    output = subprocess.run([sys.executable, "-c", code], cwd=SERVER_SCRIPT.parent, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+async def measure_stdio_session(env: dict[str, str], latitude: float) -> dict[str, float]:
+    """Seconds from spawning a stdio server to the session being ready, and to the first tool results."""
+    timings = {}
+    start = time.perf_counter()
+    async with Client(PythonStdioTransport(SERVER_SCRIPT, args=["--transport", "stdio"], env=env)) as client:
+        timings["session_ready"] = time.perf_counter() - start
+        await client.list_tools()
+        timings["first_list_tools"] = time.perf_counter() - start
+        # A new location every run, so it is the upstream connection that is measured and not the cache
+        await client.call_tool("get_forecast", {"latitude": latitude, "longitude": -122.0})
+        timings["first_get_forecast"] = time.perf_counter() - start
+        await client.call_tool("create_thumbnail", {"image_path": IMAGE_PATH})
+        timings["first_create_thumbnail"] = time.perf_counter() - start
+    return timings
+
+
+def run_startup(runs: int, env: dict[str, str]) -> dict[str, Any]:
+    samples: dict[str, list[float]] = {}
+    for run in range(runs):
+        for module in ("server", "client"):
+            samples.setdefault(f"import {module}", []).append(measure_import(module, env))
+        for prewarm in ("off", "on"):
+            # In-memory cache, a shared SQLite file would hand later runs the earlier runs' responses
+            timings = asyncio.run(measure_stdio_session(dict(env, MCP_PREWARM=prewarm, MCP_CACHE_BACKEND="memory"),
+                                                        30.0 + run / 100))
+            for name, seconds in timings.items():
+                samples.setdefault(f"stdio prewarm={prewarm} {name}", []).append(seconds)
+    return {name: summarize(values, 0, 0.0) for name, values in samples.items()}
+
+
+def print_report(report: dict[str, Any]):
+    if "startup" in report:
+        header = f"{'startup (ms)':<50} {'runs':>5} {'mean':>9} {'p50':>9} {'p95':>9} {'max':>9}"
+        print(header)
+        print("-" * len(header))
+        for name, stats in report["startup"].items():
+            print(f"{name:<50} {stats['count']:>5} {stats['mean_ms']:>9} {stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['max_ms']:>9}")
+        return
+
+    header = f"{'transport':<10} {'operation':<30} {'count':>6} {'errors':>6} {'ops/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    print(header)
+    print("-" * len(header))
+    for transport, result in report["results"].items():
+        rows = list(result["operations"].items()) + [("TOTAL", result["total"])]
+        for name, stats in rows:
+            print(f"{transport:<10} {name:<30} {stats['count']:>6} {stats['errors']:>6} {stats['throughput_per_s']:>9} "
+                  f"{stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['p99_ms']:>9}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load and latency benchmark for server.py")
+    parser.add_argument("--transports", default=",".join(TRANSPORTS), help="Comma separated, of memory, stdio, sse")
+    parser.add_argument("--operations", default=",".join(OPERATIONS), help="Comma separated, of " + ", ".join(OPERATIONS))
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent client sessions")
+    parser.add_argument("--requests", type=int, default=50, help="Requests per session")
+    parser.add_argument("--locations", type=int, default=20, help="Distinct forecast locations, fewer means more cache hits")
+    parser.add_argument("--stub-latency-ms", type=float, default=20.0, help="Latency of every NWS stub response")
+    parser.add_argument("--stub-jitter-ms", type=float, default=5.0)
+    parser.add_argument("--stub-error-rate", type=float, default=0.0, help="Fraction of NWS stub responses failing with 503")
+    parser.add_argument("--sampling-latency-ms", type=float, default=50.0, help="Latency of the fake sampling handler")
+    parser.add_argument("--startup", type=int, metavar="RUNS",
+                        help="Measure cold start over RUNS fresh processes instead of the load benchmark")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    transports = [transport.strip() for transport in args.transports.split(",") if transport.strip()]
+    operations = [operation.strip() for operation in args.operations.split(",") if operation.strip()]
+    for name in transports:
+        if name not in TRANSPORTS:
+            raise SystemExit(f"Unknown transport: {name}")
+    for name in operations:
+        if name not in OPERATIONS:
+            raise SystemExit(f"Unknown operation: {name}")
+
+    nws_base = start_nws_stub(args.stub_latency_ms, args.stub_jitter_ms, args.stub_error_rate)
+    os.environ["NWS_API_BASE"] = nws_base
+    # Keep the server processes quiet and cheap, the benchmark measures the request path
+    # Per-client rate limiting is off unless set explicitly, each benchmark session is one very busy client
+    env = dict(os.environ, NWS_API_BASE=nws_base, MCP_LOG_LEVEL=os.environ.get("MCP_LOG_LEVEL", "WARNING"),
+               MCP_RATE_LIMIT=os.environ.get("MCP_RATE_LIMIT", "0"))
+    os.environ.update(MCP_LOG_LEVEL=env["MCP_LOG_LEVEL"], MCP_RATE_LIMIT=env["MCP_RATE_LIMIT"])
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "results": {},
+    }
+    if args.startup:
+        report["startup"] = run_startup(args.startup, env)
+    for transport in transports if not args.startup else []:
+        with TransportRunner(transport, env) as runner:
+            report["results"][transport] = asyncio.run(run_transport(runner, args, operations))
+
+    print_report(report)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import base64
+import binascii
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any
+
+# Local content-addressed blob store for large tool results.
+# Big or binary results (create_thumbnail's base64 payload, image:// reads, ...) are written
+# once under their sha256 and the conversation only carries a short blob://<sha256> reference.
+# Any later tool call can pass that reference as an argument and the client swaps the bytes back in.
+BLOB_SCHEME = "blob://"
+BLOB_DIR = Path(os.environ.get("MCP_BLOB_DIR", Path(__file__).parent / ".blobs"))
+# Text results longer than this many characters are offloaded too
+INLINE_LIMIT = int(os.environ.get("MCP_BLOB_INLINE_LIMIT", "2048"))
+PREVIEW_CHARS = 200
+# A reference is the scheme and a sha256, nothing else may end up in a file path
+_DIGEST = re.compile(r"[0-9a-f]{64}")
+# Mime types a [base64 data, mime type] tool result is recognized by, anything else is left as text
+_BINARY_MIME = re.compile(r"(image|audio|application)/[\w.+-]+")
+
+
+class BlobStore:
+    def __init__(self, root: Path | str = BLOB_DIR, inline_limit: int = INLINE_LIMIT):
+        self.root = Path(root)
+        self.inline_limit = inline_limit
+
+    def _path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def _digest(self, ref: str) -> str:
+        if not is_blob_ref(ref):
+            raise ValueError(f"Not a blob reference: {ref}")
+        digest = ref.strip()[len(BLOB_SCHEME):]
+        if not _DIGEST.fullmatch(digest):
+            raise ValueError(f"Invalid blob reference: {ref}")
+        return digest
+
+    def put(self, data: bytes, mime_type: str = "application/octet-stream") -> str:
+        """Store the bytes (once) and return their blob:// reference."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        meta_path = path.with_suffix(".json")
+        # Both files are checked, a crash between the two writes gets repaired by the next put
+        if not (path.exists() and meta_path.exists()):
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to temp files first so a crash never leaves a truncated blob or metadata behind,
+            # the metadata goes first so an existing blob always has it
+            tmp_path = meta_path.with_suffix(".json.tmp")
+            tmp_path.write_text(json.dumps({"mime_type": mime_type, "size": len(data)}))
+            os.replace(tmp_path, meta_path)
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        return f"{BLOB_SCHEME}{digest}"
+
+    def get(self, ref: str) -> bytes:
+        path = self._path(self._digest(ref))
+        if not path.exists():
+            raise ValueError(f"Unknown blob: {ref}")
+        return path.read_bytes()
+
+    def info(self, ref: str) -> dict[str, Any]:
+        meta_path = self._path(self._digest(ref)).with_suffix(".json")
+        if not meta_path.exists():
+            raise ValueError(f"Unknown blob: {ref}")
+        return json.loads(meta_path.read_text())
+
+    def _store_binary(self, data: bytes, mime_type: str) -> str:
+        ref = self.put(data, mime_type)
+        return f"[{mime_type}, {len(data)} bytes stored as {ref}]"
+
+    def _store_text(self, text: str) -> str:
+        if len(text) <= self.inline_limit:
+            return text
+        ref = self.put(text.encode("utf-8"), "text/plain")
+        return f"{text[:PREVIEW_CHARS]}... [{len(text)} chars stored as {ref}]"
+
+    def _offload_text(self, text: str) -> str:
+        # Tools returning Tuple[bytes, str] (create_thumbnail, image://) arrive as a JSON list of
+        # [base64 data, mime type], store the decoded bytes whatever their size instead of the base64 text
+        if text.lstrip().startswith("[") and "/" in text:
+            try:
+                payload = json.loads(text)
+            except ValueError:
+                payload = None
+            if (isinstance(payload, list) and len(payload) == 2
+                    and all(isinstance(item, str) for item in payload) and _BINARY_MIME.fullmatch(payload[1])):
+                try:
+                    return self._store_binary(base64.b64decode(payload[0], validate=True), payload[1])
+                except binascii.Error:
+                    pass
+        return self._store_text(text)
+
+    def offload(self, contents: list[Any]) -> str:
+        """Turn tool results or resource contents into a compact string for the conversation.
+
+        Small text is kept inline, large text and binary data are replaced by a blob reference plus summary.
+        """
+        parts = []
+        for item in contents:
+            # Embedded resources wrap the actual contents
+            item = getattr(item, "resource", item)
+            mime_type = getattr(item, "mimeType", None) or "application/octet-stream"
+            if getattr(item, "blob", None) is not None:
+                parts.append(self._store_binary(base64.b64decode(item.blob), mime_type))
+            elif getattr(item, "type", None) == "image":
+                parts.append(self._store_binary(base64.b64decode(item.data), mime_type))
+            elif getattr(item, "text", None) is not None:
+                parts.append(self._offload_text(item.text))
+            else:
+                parts.append(self._store_text(str(item)))
+        return "\n".join(parts)
+
+    def resolve(self, arguments: Any) -> Any:
+        """Replace blob references in tool call arguments with the base64 encoded bytes they point to."""
+        if isinstance(arguments, dict):
+            return {key: self.resolve(value) for key, value in arguments.items()}
+        if isinstance(arguments, list):
+            return [self.resolve(value) for value in arguments]
+        if is_blob_ref(arguments):
+            data = self.get(arguments)
+            if self.info(arguments)["mime_type"] == "text/plain":
+                return data.decode("utf-8")
+            return base64.b64encode(data).decode("ascii")
+        return arguments
+
+
+def is_blob_ref(value: Any) -> bool:
+    return isinstance(value, str) and value.strip().startswith(BLOB_SCHEME)
@@ -0,0 +1,141 @@
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+# Cache/state backends for the server
+# InMemoryCache lives inside one process, SQLiteCache is a local file shared by every worker
+# of the multi-worker mode so forecast/alert/thumbnail results computed by one worker serve all of them.
+# Values must be JSON serializable.
+CACHE_BACKEND = os.environ.get("MCP_CACHE_BACKEND", "memory")
+CACHE_PATH = os.environ.get("MCP_CACHE_PATH", str(Path(__file__).parent / ".cache.sqlite3"))
+CACHE_MAX_ENTRIES = int(os.environ.get("MCP_CACHE_MAX_ENTRIES", "1024"))
+# Seconds a SQLite cache call waits for another worker's lock, it runs on the event loop so this stays short
+CACHE_BUSY_TIMEOUT = float(os.environ.get("MCP_CACHE_BUSY_TIMEOUT", "0.05"))
+
+
+class CacheBackend:
+    """Interface of the cache backends, get returns None on a miss or an expired entry."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Any | None:
+        value = self._get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        raise NotImplementedError
+
+    def _get(self, key: str) -> Any | None:
+        raise NotImplementedError
+
+    def size(self) -> int:
+        raise NotImplementedError
+
+    def stats(self) -> dict[str, Any]:
+        return {"backend": type(self).__name__, "hits": self.hits, "misses": self.misses, "entries": self.size()}
+
+
+class InMemoryCache(CacheBackend):
+    """Per process LRU cache with expiry."""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        super().__init__()
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def _get(self, key: str) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self._entries[key] = (time.time() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache(CacheBackend):
+    """Cache in a local SQLite file, shared between the worker processes."""
+
+    # Expired rows are purged every this many writes
+    PURGE_EVERY = 100
+
+    def __init__(self, path: str = CACHE_PATH, busy_timeout: float = CACHE_BUSY_TIMEOUT):
+        super().__init__()
+        self.path = path
+        # Calls that hit a locked database, counted as misses or skipped writes
+        self.busy = 0
+        # WAL lets the workers read while another one writes
+        self._db = sqlite3.connect(path, timeout=5.0, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._writes = 0
+        # The setup above may wait for the other workers, the calls from the tools must not stall the event loop
+        self._db.execute(f"PRAGMA busy_timeout = {int(busy_timeout * 1000)}")
+
+    def _get(self, key: str) -> Any | None:
+        try:
+            row = self._db.execute(
+                "SELECT value FROM cache WHERE key = ? AND expires_at >= ?", (key, time.time())
+            ).fetchone()
+        except sqlite3.OperationalError:
+            # Locked by another worker, refetching is cheaper than waiting
+            self.busy += 1
+            return None
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        now = time.time()
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, separators=(",", ":")), now + ttl),
+            )
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                self._db.execute("DELETE FROM cache WHERE expires_at < ?", (now,))
+        except sqlite3.OperationalError:
+            # Locked by another worker, the value is simply not cached this time
+            self.busy += 1
+
+    def size(self) -> int:
+        try:
+            return self._db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        except sqlite3.OperationalError:
+            self.busy += 1
+            return -1
+
+    def stats(self) -> dict[str, Any]:
+        return {**super().stats(), "busy": self.busy}
+
+
+def create_cache(backend: str = CACHE_BACKEND) -> CacheBackend:
+    """Build the cache backend selected by MCP_CACHE_BACKEND (memory or sqlite)."""
+    if backend == "memory":
+        return InMemoryCache()
+    if backend == "sqlite":
+        return SQLiteCache()
+    raise ValueError(f"Unknown cache backend: {backend}")
@@ -1,8 +1,10 @@
 import asyncio
+import os
 import sys
 import json
+import threading
+import time
 from fastmcp import Client
-from openai import AzureOpenAI
 from fastmcp.client.sampling import (
     SamplingMessage,
     SamplingParams,
@@ -11,7 +13,9 @@ from fastmcp.client.sampling import (
 from fastmcp.client.logging import LogMessage
 from mcp.shared.session import RequestResponder
 from pprint import pprint
-from azure.identity import DefaultAzureCredential, get_bearer_token_provider  
+from blob_store import BlobStore
+from session_store import SessionStore
+from multi_client import MultiServerClient
 
 class bcolors:
     HEADER = '\033[95m'
@@ -24,18 +28,46 @@ class bcolors:
     BOLD = '\033[1m'
     UNDERLINE = '\033[4m'
 
-# Initialize Azure OpenAI client with Entra ID authentication
-token_provider = get_bearer_token_provider(  
-    DefaultAzureCredential(),  
-    "https://cognitiveservices.azure.com/.default"  
-)  
-
 MODEL_NAME = "gpt-35-turbo"  # Change this to your desired model name
-openai_client = AzureOpenAI(  
-    azure_endpoint="https://mcp-azure-openai.openai.azure.com/",
-    azure_ad_token_provider=token_provider,  
-    api_version="2025-01-01-preview",
-)
+# The Azure OpenAI client is created on first use, importing openai/azure.identity and fetching
+# the Entra ID token take longer than connecting to the MCP servers
+# MCP_PREWARM=off disables doing that in the background while the chat connects
+PREWARM = os.environ.get("MCP_PREWARM", "on").lower() != "off"
+openai_client = None
+token_provider = None
+_openai_client_lock = threading.Lock()
+
+def get_openai_client():
+    """Azure OpenAI client with Entra ID authentication, created once."""
+    global openai_client, token_provider
+    with _openai_client_lock:
+        if openai_client is None:
+            from openai import AzureOpenAI
+            from azure.identity import DefaultAzureCredential, get_bearer_token_provider
+
+            # Initialize Azure OpenAI client with Entra ID authentication
+            token_provider = get_bearer_token_provider(  
+                DefaultAzureCredential(),  
+                "https://cognitiveservices.azure.com/.default"  
+            )  
+            openai_client = AzureOpenAI(  
+                azure_endpoint="https://mcp-azure-openai.openai.azure.com/",
+                azure_ad_token_provider=token_provider,  
+                api_version="2025-01-01-preview",
+            )
+    return openai_client
+
+def prewarm():
+    """Create the OpenAI client and fetch the first token in a background thread."""
+    def run():
+        try:
+            get_openai_client()
+            # The provider caches the token until it is about to expire
+            token_provider()
+        except Exception as e:
+            # The first real request reports it again
+            print(f"{bcolors.WARNING}Prewarm failed: {e}{bcolors.ENDC}")
+    threading.Thread(target=run, name="openai-prewarm", daemon=True).start()
 
 
 async def sampling_handler(
@@ -53,7 +85,7 @@ async def sampling_handler(
                 "content": m.content.text
             })
 
-    response = openai_client.chat.completions.create(  
+    response = get_openai_client().chat.completions.create(  
         model=MODEL_NAME,
         messages=openai_messages,
         max_tokens=800,  
@@ -68,11 +100,43 @@ async def sampling_handler(
     response_message = response.choices[0].message.content
     return response_message
 
+# Server notifications are buffered and printed in batches every MCP_RENDER_INTERVAL seconds,
+# so a flood of log/progress messages costs one terminal write per batch instead of one per message
+RENDER_INTERVAL = float(os.environ.get("MCP_RENDER_INTERVAL", "0.1"))
+
+class NotificationPrinter:
+    """Buffers lines and writes them out in one go, consecutive repeats are printed once with a count."""
+
+    def __init__(self, interval: float = RENDER_INTERVAL):
+        self.interval = interval
+        self._lines: list[list] = []  # [line, count]
+        self._timer: asyncio.TimerHandle | None = None
+
+    def add(self, line: str):
+        if self._lines and self._lines[-1][0] == line:
+            self._lines[-1][1] += 1
+        else:
+            self._lines.append([line, 1])
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.interval, self.flush)
+
+    def flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._lines:
+            return
+        lines, self._lines = self._lines, []
+        sys.stdout.write("\n".join(line if count == 1 else f"{line} (x{count})" for line, count in lines) + "\n")
+        sys.stdout.flush()
+
+notification_printer = NotificationPrinter()
+
 async def log_handler(params: LogMessage):
-    print(f"[Server Log - {params.level.upper()}] {params.logger or 'default'}: {params.data}\n\n\n")
+    notification_printer.add(f"[Server Log - {params.level.upper()}] {params.logger or 'default'}: {params.data}")
 
 async def message_handler(message: RequestResponder):
-    print(f"{bcolors.OKBLUE}[Client Log] Received message:{bcolors.ENDC}{message}\n\n\n")
+    notification_printer.add(f"{bcolors.OKBLUE}[Client Log] Received message:{bcolors.ENDC}{message}")
 
 # Create MCP client
 # Local STDIO
@@ -86,8 +150,22 @@ async def message_handler(message: RequestResponder):
 #     message_handler=message_handler)
 
 # SSE
-client = Client(
-    "http://localhost:9000/sse", 
+# client = Client(
+#     "http://localhost:9000/sse", 
+#     sampling_handler=sampling_handler, 
+#     log_handler=log_handler,
+#     roots=[
+#         "file://home/projects/roots-example/frontend"
+#     ],
+#     message_handler=message_handler)
+
+# Multiple servers and replicas
+# Comma separated MCP endpoints, SSE urls and local stdio server scripts can be mixed, e.g.
+# MCP_SERVERS="http://localhost:9000/sse,http://localhost:9001/sse"
+# Tool catalogs are merged, calls are routed to a healthy server offering the tool (least outstanding requests first)
+MCP_SERVERS = os.environ.get("MCP_SERVERS", "http://localhost:9000/sse").split(",")
+client = MultiServerClient(
+    [server.strip() for server in MCP_SERVERS if server.strip()],
     sampling_handler=sampling_handler, 
     log_handler=log_handler,
     roots=[
@@ -95,6 +173,11 @@ client = Client(
     ],
     message_handler=message_handler)
 
+# Large or binary tool results are kept in a local blob store and only referenced in the conversation
+blob_store = BlobStore()
+# Chat sessions are logged locally as they go and can be resumed with: python client.py resume [session id]
+session_store = SessionStore()
+
 # Get OpenAI format tool schemas from MCP server for function calling
 async def get_openAI_tool_schema():
     """Get tool schemas from the MCP server and convert them to OpenAI function format."""
@@ -118,10 +201,17 @@ async def get_openAI_tool_schema():
             # If the tool has a structured inputSchema, use it directly
             if 'properties' in tool.inputSchema:
                 for param_name, param_def in tool.inputSchema['properties'].items():
+                    # Optional parameters (e.g. float | None) are an anyOf of the type and null
+                    param_type = param_def.get('type') or next(
+                        (option['type'] for option in param_def.get('anyOf', []) if option.get('type', 'null') != 'null'), 'string')
                     function_def["parameters"]["properties"][param_name] = {
-                        "type": param_def.get('type', 'string'),
+                        "type": param_type,
                         "description": param_def.get('description', param_def.get('title', f"Parameter {param_name}"))
                     }
+                    # Choices and defaults of options (e.g. output of get_forecast), item types of lists
+                    for key in ("enum", "default", "items"):
+                        if key in param_def:
+                            function_def["parameters"]["properties"][param_name][key] = param_def[key]
                 
                 if 'required' in tool.inputSchema:
                     function_def["parameters"]["required"] = tool.inputSchema['required']
@@ -172,40 +262,60 @@ async def get_system_message(client):
         Available resources templates: {resourcesTemplates_schemas}
         Available prompts: {prompts_schemas}
         You can use the prompts to get information about the resources.
+        Large tool results are stored locally and shown as blob://<sha256> references with a short summary.
+        To reuse that data in another tool call (e.g. image_bytes_base64 of save_thumbnail), pass the reference itself as the argument value.
         """
     return system_instruction
 
-async def chat_loop():
+def assistant_message(message) -> dict:
+    """Assistant message of a completion as a plain dict, the form the conversation is logged and resent in."""
+    entry = {"role": "assistant", "content": message.content}
+    if message.tool_calls:
+        entry["tool_calls"] = [tool_call.model_dump(exclude_none=True) for tool_call in message.tool_calls]
+    return entry
+
+async def chat_loop(resume: bool = False, session_id: str | None = None):
     """Interactive chat loop with Azure OpenAI function calling for MCP tools."""
     print("Welcome to the Azure OpenAI Chat with MCP Tools! Type 'exit' to quit.")
     print("Ensure you have set the following values:")
     print("- AZURE_OPENAI_ENDPOINT")
     print("- AZURE_OPENAI_DEPLOYMENT_NAME")
+    if PREWARM:
+        prewarm()
     
     # Connect to MCP server
     async with client:
         print(f"MCP Client connected: {client.is_connected()}")
-        system_message = await get_system_message(client)
-        conversation = []
-        conversation = [{"role": "system", "content": system_message}]
-
-        # Get tool schemas for function calling
-        openAI_tool_schemas = await get_openAI_tool_schema()
+        if resume:
+            # The stored system message and tool schemas are reused, no catalog round trips
+            try:
+                session = session_store.resume(session_id)
+            except ValueError as e:
+                print(e)
+                return
+            print(f"Resumed session {session.id} with {len(session.messages)} messages")
+        else:
+            system_message = await get_system_message(client)
+            # Get tool schemas for function calling
+            openAI_tool_schemas = await get_openAI_tool_schema()
+            session = session_store.create(system_message, openAI_tool_schemas)
+            print(f"Session {session.id}, continue it later with: python client.py resume {session.id}")
         # Main chat loop
         while True:
             try:
-                # Get user input
+                # Get user input, pending notifications first so they do not end up after the prompt
+                notification_printer.flush()
                 user_prompt = input(f"\n{bcolors.OKGREEN}Type the question:{bcolors.ENDC}\n\n\n")
                 
                 if user_prompt.lower() in ["exit", "quit", "bye"]:
                     print("Goodbye!\n\n\n")
                     break
                 
-                conversation.append({"role": "user", "content": user_prompt})
+                session.append({"role": "user", "content": user_prompt})
 
-                response = openai_client.chat.completions.create(  
+                response = get_openai_client().chat.completions.create(  
                     model=MODEL_NAME,
-                    messages=conversation,
+                    messages=session.conversation(),
                     max_tokens=800,  
                     temperature=0.7,  
                     top_p=0.95,  
@@ -213,38 +323,54 @@ async def chat_loop():
                     presence_penalty=0,
                     stop=None,  
                     stream=False,
-                    tools=openAI_tool_schemas,
+                    tools=session.tool_schemas,
                     tool_choice="auto"
                 )
 
                 print(response.to_json(indent=2) + "\n\n\n")
 
                 response_message = response.choices[0].message
-                conversation.append(response_message)
+                session.append(assistant_message(response_message))
 
                 if response_message.tool_calls:
-                    for tool_call in response_message.tool_calls:
-                        function_name = tool_call.function.name
-                        function_args = json.loads(tool_call.function.arguments)
-                        print(f"Function call: {function_name}\n\n\n")  
-                        print(f"Function arguments: {function_args}\n\n\n")  
-                        
-                        # Execute the tool call using the MCP client
-                        tool_result = await client.call_tool(function_name, function_args)
-                        print(f"Tool result: {tool_result}\n\n\n")
-                        
-                        conversation.append({
-                            "tool_call_id": tool_call.id,
-                            "role": "tool",
-                            "name": function_name,
-                            "content": tool_result,
-                        })
+                    answered = 0
+                    try:
+                        for tool_call in response_message.tool_calls:
+                            function_name = tool_call.function.name
+                            print(f"Function call: {function_name}\n\n\n")
+
+                            # Execute the tool call using the MCP client, blob references are swapped back to their data
+                            try:
+                                function_args = json.loads(tool_call.function.arguments)
+                                print(f"Function arguments: {function_args}\n\n\n")
+                                tool_result = await client.call_tool(function_name, blob_store.resolve(function_args))
+                                # Only a reference plus summary of large or binary results goes into the conversation
+                                tool_content = blob_store.offload(tool_result)
+                            except Exception as e:
+                                # Every tool call needs its result message, or the logged history cannot be resent
+                                tool_content = f"Error: {e}"
+                            notification_printer.flush()
+                            print(f"Tool result: {tool_content}\n\n\n")
+
+                            session.append({
+                                "tool_call_id": tool_call.id,
+                                "role": "tool",
+                                "name": function_name,
+                                "content": tool_content,
+                            })
+                            answered += 1
+                    finally:
+                        # Interrupted halfway, the calls not run yet still get a result for the same reason
+                        for tool_call in response_message.tool_calls[answered:]:
+                            session.append({
+                                "tool_call_id": tool_call.id,
+                                "role": "tool",
+                                "name": tool_call.function.name,
+                                "content": "Error: tool call interrupted",
+                            })
                 else:
-                    # Just show the AI response if no tool calls
+                    # Just show the AI response if no tool calls, it is in the conversation history already
                     print(f"Final Response: {response_message.content}\n\n\n")
-                    
-                    # Add assistant response to conversation history
-                    conversation.append({"role": "assistant", "content": response_message.content})
                    
             except KeyboardInterrupt:
                 print("\nChat session terminated.")
@@ -252,6 +378,8 @@ async def chat_loop():
             except Exception as e:
                 print(f"\nError: {str(e)}")
                 print("Try again or type 'exit' to quit.")
+        session.close()
+    notification_printer.flush()
 
 async def main():
     # Connection is established here
@@ -290,7 +418,7 @@ async def main():
         # conversation.append({"role": "user", "content": "Whats the weather in kirkland?"})
         # pprint(f"conversation1: {conversation}\n\n\n")
 
-        # response = openai_client.chat.completions.create(  
+        # response = get_openai_client().chat.completions.create(  
         #     model=MODEL_NAME,
         #     messages=conversation,
         #     max_tokens=800,  
@@ -325,7 +453,7 @@ async def main():
         #         "content": "tool result:" + str(tool_call),
         #     })
 
-        # response = openai_client.chat.completions.create(  
+        # response = get_openai_client().chat.completions.create(  
         #     model=MODEL_NAME,
         #     messages=conversation,
         #     max_tokens=800,  
@@ -372,7 +500,7 @@ async def main():
         # openAI_tool_schemas = await get_openAI_tool_schema()
         # pprint(f"OpenAI Tool Schema {openAI_tool_schemas}\n\n\n")
 
-        # response = openai_client.chat.completions.create(  
+        # response = get_openai_client().chat.completions.create(  
         #     model=MODEL_NAME,
         #     messages=conversation,
         #     max_tokens=800,  
@@ -411,7 +539,7 @@ async def main():
         #         })
                 
 
-        # response = openai_client.chat.completions.create(  
+        # response = get_openai_client().chat.completions.create(  
         #     model=MODEL_NAME,
         #     messages=conversation,
         #     max_tokens=800,  
@@ -435,7 +563,7 @@ async def main():
         # conversation = [{"role": "system", "content": system_message}]
         # conversation.append({"role": "user", "content": "Generate a short poem about the AI."})
         
-        # response = openai_client.chat.completions.create(  
+        # response = get_openai_client().chat.completions.create(  
         #     model=MODEL_NAME,
         #     messages=conversation,
         #     max_tokens=800,  
@@ -478,7 +606,7 @@ async def main():
         # conversation = [{"role": "system", "content": system_message}]
         # conversation.append({"role": "user", "content": "Summarize document of the resource mcp overview"})
         
-        # response = openai_client.chat.completions.create(  
+        # response = get_openai_client().chat.completions.create(  
         #     model=MODEL_NAME,
         #     messages=conversation,
         #     max_tokens=800,  
@@ -528,7 +656,7 @@ async def main():
 #         conversation = [{"role": prompt.role, "content": prompt.content.text} for prompt in debug_prompt]
 #         pprint(f"conversation: {conversation}\n\n\n")
         
-#         response = openai_client.chat.completions.create(  
+#         response = get_openai_client().chat.completions.create(  
 #             model=MODEL_NAME,
 #             messages=conversation,
 #             max_tokens=800,  
@@ -546,11 +674,18 @@ async def main():
 
 
     # Connection is closed automatically here
+    notification_printer.flush()
     print(f"Client connected: {client.is_connected()}")
 
 if __name__ == "__main__":
     # Check if the user wants to run in chat mode
     if len(sys.argv) > 1 and sys.argv[1] == "chat":
         asyncio.run(chat_loop())
+    elif len(sys.argv) > 1 and sys.argv[1] == "resume":
+        # Latest session unless an id is given
+        asyncio.run(chat_loop(resume=True, session_id=sys.argv[2] if len(sys.argv) > 2 else None))
+    elif len(sys.argv) > 1 and sys.argv[1] == "sessions":
+        for saved in session_store.list():
+            print(f"{saved['id']}  updated {time.strftime('%Y-%m-%d %H:%M', time.localtime(saved['updated']))}  {saved['log_bytes']} bytes")
     else:
         asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import uvicorn
+
+logger = logging.getLogger(__name__)
+
+# Multi-worker server mode
+# Starts N server.py SSE worker processes and serves them behind one port through a small streaming proxy.
+# SSE sessions are stateful (the POSTed messages must reach the worker holding the event stream), so
+# worker i advertises /w{i}/messages/ as its message endpoint and the proxy routes on that prefix.
+# New /sse sessions go to the worker with the fewest open streams.
+# Workers share their forecast/alert/thumbnail caches through the SQLite cache backend.
+SERVER_SCRIPT = Path(__file__).parent / "server.py"
+WORKER_HOST = "127.0.0.1"
+WORKER_CHECK_INTERVAL = 1.0
+WORKER_START_TIMEOUT = 30.0
+WORKER_STOP_TIMEOUT = 10.0
+# Hop-by-hop headers are not forwarded
+HOP_HEADERS = {b"connection", b"keep-alive", b"transfer-encoding", b"upgrade", b"host"}
+WORKER_PATH = re.compile(r"^/w(\d+)/")
+
+
+def worker_message_path(index: int) -> str:
+    return f"/w{index}/messages/"
+
+
+class Worker:
+    def __init__(self, index: int, port: int, args: list[str]):
+        self.index = index
+        self.port = port
+        self.args = args
+        self.open_streams = 0
+        self.process: subprocess.Popen | None = None
+        # Only listening workers get new sessions
+        self.ready = False
+
+    def start(self):
+        self.ready = False
+        env = dict(os.environ, MCP_CACHE_BACKEND=os.environ.get("MCP_CACHE_BACKEND", "sqlite"))
+        self.process = subprocess.Popen(
+            [sys.executable, str(SERVER_SCRIPT), "--worker-index", str(self.index), "--port", str(self.port), *self.args],
+            env=env,
+        )
+        logger.info("Started worker %d (pid %d) on port %d", self.index, self.process.pid, self.port)
+
+    def wait_ready(self, timeout: float = WORKER_START_TIMEOUT):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection((WORKER_HOST, self.port), timeout=1.0).close()
+                self.ready = True
+                return
+            except OSError:
+                time.sleep(0.1)
+        raise RuntimeError(f"Worker {self.index} did not start listening on port {self.port}")
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(WORKER_STOP_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+class WorkerProxy:
+    """ASGI app forwarding requests to the workers, response bodies are streamed back as they arrive."""
+
+    def __init__(self, workers: list[Worker]):
+        self.workers = workers
+        self._client: httpx.AsyncClient | None = None
+        self._monitor: asyncio.Task | None = None
+
+    async def _monitor_workers(self):
+        # Restart workers that died, their sessions are lost but new ones keep being served
+        while True:
+            await asyncio.sleep(WORKER_CHECK_INTERVAL)
+            for worker in self.workers:
+                if worker.process.poll() is not None:
+                    worker.ready = False
+                    logger.warning("Worker %d exited with %s, restarting", worker.index, worker.process.returncode)
+                    worker.start()
+                    # Back into the routing only once it listens, as on startup
+                    try:
+                        await asyncio.to_thread(worker.wait_ready)
+                    except RuntimeError as e:
+                        # Stopped so the next check restarts it again
+                        logger.warning("%s, restarting it again", e)
+                        await asyncio.to_thread(worker.stop)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self._client = httpx.AsyncClient(timeout=None, limits=httpx.Limits(max_connections=None))
+                self._monitor = asyncio.create_task(self._monitor_workers())
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self._monitor.cancel()
+                await self._client.aclose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def _pick(self, path: str) -> Worker | None:
+        match = WORKER_PATH.match(path)
+        if match and int(match.group(1)) < len(self.workers):
+            return self.workers[int(match.group(1))]
+        ready = [worker for worker in self.workers if worker.ready and worker.process.poll() is None]
+        if not ready:
+            return None
+        return min(ready, key=lambda worker: worker.open_streams)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        if scope["type"] != "http":
+            return
+
+        worker = self._pick(scope["path"])
+        if worker is None:
+            await send({"type": "http.response.start", "status": 503, "headers": []})
+            await send({"type": "http.response.body", "body": b"No worker available"})
+            return
+        # Counted from the moment of picking so concurrent new sessions spread over the workers
+        worker.open_streams += 1
+        try:
+            await self._forward(worker, scope, receive, send)
+        finally:
+            worker.open_streams -= 1
+
+    async def _forward(self, worker: Worker, scope, receive, send):
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+        url = f"http://{WORKER_HOST}:{worker.port}{scope['raw_path'].decode()}"
+        if scope["query_string"]:
+            url += "?" + scope["query_string"].decode()
+        headers = [(name, value) for name, value in scope["headers"] if name.lower() not in HOP_HEADERS]
+        request = self._client.build_request(scope["method"], url, headers=headers, content=body)
+        try:
+            response = await self._client.send(request, stream=True)
+        except httpx.HTTPError as e:
+            logger.warning("Worker %d unreachable: %s", worker.index, e)
+            await send({"type": "http.response.start", "status": 502, "headers": []})
+            await send({"type": "http.response.body", "body": b"Worker unavailable"})
+            return
+
+        try:
+            await send({
+                "type": "http.response.start",
+                "status": response.status_code,
+                "headers": [(name, value) for name, value in response.headers.raw if name.lower() not in HOP_HEADERS],
+            })
+
+            async def stream_body():
+                async for chunk in response.aiter_raw():
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                await send({"type": "http.response.body", "body": b""})
+
+            async def wait_disconnect():
+                while (await receive())["type"] != "http.disconnect":
+                    pass
+
+            # An SSE stream only ends when the client goes away, stop forwarding as soon as it does
+            tasks = [asyncio.create_task(stream_body()), asyncio.create_task(wait_disconnect())]
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in pending:
+                task.cancel()
+            for task in done:
+                task.result()
+        finally:
+            await response.aclose()
+
+
+def run_cluster(workers: int, host: str, port: int, worker_base_port: int | None = None, worker_args: list[str] | None = None):
+    """Run `workers` SSE server processes behind host:port, worker_args are passed on to every server.py worker."""
+    worker_base_port = worker_base_port or port + 1
+    pool = [Worker(index, worker_base_port + index, worker_args or []) for index in range(workers)]
+    # uvicorn re-raises SIGTERM once it has shut down, turn it into SystemExit so the workers get stopped
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    for worker in pool:
+        worker.start()
+    try:
+        for worker in pool:
+            worker.wait_ready()
+        uvicorn.run(WorkerProxy(pool), host=host, port=port, log_config=None)
+    finally:
+        for worker in pool:
+            worker.stop()
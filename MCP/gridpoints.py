@@ -0,0 +1,158 @@
+import math
+import re
+import warnings
+from datetime import datetime, timezone
+from typing import Any
+
+import numpy as np
+
+# Decoding and statistics of the NWS gridpoint time series (forecastGridData of a /points response)
+# Every series is a list of {"validTime": "<start>/<ISO-8601 duration>", "value": v}, one entry per run of
+# equal values. decode_grid() turns them into dense hourly NumPy arrays once per grid cell,
+# window_stats() then reduces the arrays of all requested locations and windows in one go.
+
+# Name -> (NWS property, accumulated)
+# Accumulated amounts (precipitation, snow) are spread evenly over their interval, other values hold for every hour of it
+SERIES = {
+    "temperature": ("temperature", False),
+    "wind_speed": ("windSpeed", False),
+    "wind_gust": ("windGust", False),
+    "precipitation_probability": ("probabilityOfPrecipitation", False),
+    "precipitation": ("quantitativePrecipitation", True),
+    "snowfall": ("snowfallAmount", True),
+}
+# NWS unit -> (unit, scale, offset) of the US customary units
+US_UNITS = {
+    "wmoUnit:degC": ("degF", 1.8, 32.0),
+    "wmoUnit:km_h-1": ("mph", 0.621371, 0.0),
+    "wmoUnit:mm": ("in", 0.0393701, 0.0),
+}
+# Series a threshold can be set on
+THRESHOLD_SERIES = ("temperature", "wind_speed", "wind_gust", "precipitation_probability")
+
+_DURATION = re.compile(r"P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$")
+
+
+def parse_interval(valid_time: str) -> tuple[int, int]:
+    """"2025-05-01T12:00:00+00:00/PT3H" -> (start in hours since the epoch, length in hours)"""
+    start, duration = valid_time.split("/")
+    match = _DURATION.match(duration)
+    if not match:
+        raise ValueError(f"Unsupported duration: {duration}")
+    days, hours, minutes, seconds = (int(group or 0) for group in match.groups())
+    start_hour = math.floor(datetime.fromisoformat(start).timestamp() / 3600)
+    return start_hour, max(1, days * 24 + hours + round((minutes * 60 + seconds) / 3600))
+
+
+def decode_series(values: list[dict], start_hour: int, hours: int, accumulated: bool) -> np.ndarray:
+    """Dense hourly array of one series from start_hour on, NaN where it has no value."""
+    dense = np.full(hours, np.nan)
+    if not values:
+        return dense
+    intervals = np.array([parse_interval(value["validTime"]) for value in values], dtype=np.int64)
+    amounts = np.array([np.nan if value["value"] is None else value["value"] for value in values], dtype=float)
+    offsets, lengths = intervals[:, 0] - start_hour, intervals[:, 1]
+    if accumulated:
+        amounts = amounts / lengths
+    # Index of every hour of every interval, its interval's offset plus 0..length-1
+    index = np.repeat(offsets - (np.cumsum(lengths) - lengths), lengths) + np.arange(lengths.sum())
+    per_hour = np.repeat(amounts, lengths)
+    inside = (index >= 0) & (index < hours)
+    dense[index[inside]] = per_hour[inside]
+    return dense
+
+
+def grid_properties(properties: dict) -> dict[str, Any]:
+    """The part of a gridpoint response decode_grid() reads, validTimes and the SERIES layers out of dozens."""
+    trimmed = {"validTimes": properties["validTimes"]}
+    for prop, _ in SERIES.values():
+        if prop in properties:
+            trimmed[prop] = properties[prop]
+    return trimmed
+
+
+def decode_grid(properties: dict) -> dict[str, Any]:
+    """Hourly arrays of the SERIES of a gridpoint response, covering its validTimes."""
+    start_hour, hours = parse_interval(properties["validTimes"])
+    series, units = {}, {}
+    for name, (prop, accumulated) in SERIES.items():
+        data = properties.get(prop) or {}
+        series[name] = decode_series(data.get("values", []), start_hour, hours, accumulated)
+        units[name] = data.get("uom", "")
+    return {"start_hour": start_hour, "series": series, "units": units}
+
+
+def _convert(values: np.ndarray, uom: str, us_units: bool) -> tuple[np.ndarray, str]:
+    if us_units and uom in US_UNITS:
+        unit, scale, offset = US_UNITS[uom]
+        return values * scale + offset, unit
+    return values, uom.removeprefix("wmoUnit:")
+
+
+def _window(grid: dict, name: str, from_hour: int, hours: int) -> np.ndarray:
+    # The requested hours of a series, NaN outside of what the grid covers
+    window = np.full(hours, np.nan)
+    series = grid["series"][name]
+    offset = from_hour - grid["start_hour"]
+    low, high = max(offset, 0), min(offset + hours, len(series))
+    if high > low:
+        window[low - offset:high - offset] = series[low:high]
+    return window
+
+
+def window_stats(grids: list[dict], from_hour: int, hours: int, window_hours: int, us_units: bool = True,
+                 thresholds: dict[str, float] | None = None) -> dict[str, Any]:
+    """Statistics per location (one decoded grid each) and window of window_hours, over hours from from_hour on.
+
+    thresholds maps "<series>_above" / "<series>_below" to a value (in the output units),
+    the hours past it are counted per window.
+    """
+    windows = math.ceil(hours / window_hours)
+    data, units = {}, {}
+    for name in SERIES:
+        rows = []
+        for grid in grids:
+            values, units[name] = _convert(_window(grid, name, from_hour, hours), grid["units"][name], us_units)
+            rows.append(values)
+        # (locations, windows, hours per window), the last window is padded with NaN
+        stacked = np.full((len(grids), windows * window_hours), np.nan)
+        stacked[:, :hours] = np.array(rows).reshape(len(grids), hours)
+        data[name] = stacked.reshape(len(grids), windows, window_hours)
+
+    with warnings.catch_warnings():
+        # Windows without any value give NaN (reported as null), not a warning
+        warnings.simplefilter("ignore", RuntimeWarning)
+        stats = {
+            "temperature_min": np.nanmin(data["temperature"], axis=2),
+            "temperature_max": np.nanmax(data["temperature"], axis=2),
+            "temperature_mean": np.nanmean(data["temperature"], axis=2),
+            "wind_speed_max": np.nanmax(data["wind_speed"], axis=2),
+            "wind_speed_mean": np.nanmean(data["wind_speed"], axis=2),
+            "wind_gust_max": np.nanmax(data["wind_gust"], axis=2),
+            "precipitation_probability_max": np.nanmax(data["precipitation_probability"], axis=2),
+        }
+    for name in ("precipitation", "snowfall"):
+        values = data[name]
+        stats[f"{name}_total"] = np.where(np.isnan(values).all(axis=2), np.nan, np.nansum(values, axis=2))
+    for key, threshold in (thresholds or {}).items():
+        name, direction = key.rsplit("_", 1)
+        # NaN compares false, hours without a value are never counted
+        past = data[name] > threshold if direction == "above" else data[name] < threshold
+        stats[f"hours_{key}"] = past.sum(axis=2)
+
+    starts = [datetime.fromtimestamp((from_hour + index * window_hours) * 3600, timezone.utc).strftime("%Y-%m-%dT%H:%MZ")
+              for index in range(windows)]
+    locations = [
+        [
+            {"start": start, **{key: _number(values[location, index]) for key, values in stats.items()}}
+            for index, start in enumerate(starts)
+        ]
+        for location in range(len(grids))
+    ]
+    return {"units": units, "windows": locations}
+
+
+def _number(value) -> float | int | None:
+    if isinstance(value, np.integer):
+        return int(value)
+    return None if np.isnan(value) else round(float(value), 2)
@@ -0,0 +1,125 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from typing import Any
+
+# Logging pipeline for the server
+# Records are handed to a queue on the hot path, a background thread formats and writes them to stderr.
+# Configured from the environment:
+#   MCP_LOG_LEVEL     root level (default INFO)
+#   MCP_LOG_LEVELS    per-logger levels, e.g. "httpx=WARNING,mcp=INFO"
+#   MCP_LOG_FORMAT    json or text (default text)
+#   MCP_LOG_SAMPLE    keep one in N records of chatty loggers, e.g. "mcp.server.lowlevel.server=10"
+#                     warnings and errors are never sampled out
+# The log notifications tools send to the client are configured in notifications.py
+LOG_LEVEL = os.environ.get("MCP_LOG_LEVEL", "INFO")
+LOG_FORMAT = os.environ.get("MCP_LOG_FORMAT", "text")
+# Libraries that log every request or connection at INFO/DEBUG
+DEFAULT_LOG_LEVELS = {
+    "httpx": "WARNING",
+    "httpcore": "WARNING",
+    "sse_starlette": "WARNING",
+    "uvicorn.access": "WARNING",
+}
+DEFAULT_LOG_SAMPLE = {
+    # "Processing request of type ..." for every MCP request
+    "mcp.server.lowlevel.server": 10,
+}
+
+# Attributes every LogRecord has, anything else was passed through extra= and goes into the JSON output
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+_listener: logging.handlers.QueueListener | None = None
+
+
+def _parse_mapping(value: str) -> dict[str, str]:
+    """"a=1,b=2" -> {"a": "1", "b": "2"}"""
+    mapping = {}
+    for item in value.split(","):
+        if "=" in item:
+            key, val = item.split("=", 1)
+            mapping[key.strip()] = val.strip()
+    return mapping
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps one in `every` records below WARNING of the given logger (and its children)."""
+
+    def __init__(self, name: str, every: int):
+        super().__init__(name)
+        self.every = max(1, every)
+        self._count = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not super().filter(record):
+            return True
+        self._count += 1
+        return (self._count - 1) % self.every == 0
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting is left to the listener thread, the caller only pays for the enqueue
+        return record
+
+
+def configure_logging() -> None:
+    """Route all logging through a queue to a single stderr writer thread (idempotent)."""
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    if LOG_FORMAT == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    sample = DEFAULT_LOG_SAMPLE | {name: int(every) for name, every in _parse_mapping(os.environ.get("MCP_LOG_SAMPLE", "")).items()}
+    for name, every in sample.items():
+        queue_handler.addFilter(SamplingFilter(name, every))
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(LOG_LEVEL)
+
+    # FastMCP installs its own (synchronous) rich handler, let its records go through the queue instead.
+    # It also pins its logger at INFO, unset that so MCP_LOG_LEVEL and MCP_LOG_LEVELS apply (set below).
+    fastmcp_logger = logging.getLogger("FastMCP")
+    for handler in fastmcp_logger.handlers[:]:
+        fastmcp_logger.removeHandler(handler)
+    fastmcp_logger.setLevel(logging.NOTSET)
+
+    levels = DEFAULT_LOG_LEVELS | _parse_mapping(os.environ.get("MCP_LOG_LEVELS", ""))
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(level.upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    _listener.start()
+    # Flush what is still queued on exit
+    atexit.register(_listener.stop)
@@ -0,0 +1,193 @@
+import bisect
+import math
+import time
+from typing import Any, Callable
+
+import mcp.types as types
+
+# Instrumentation for the server
+# Every tool call, resource read and prompt request goes through the low level request handlers,
+# metrics_layer() is the request handler layer recording call counts, error counts and latency histograms per handler.
+# Upstream (NWS) request timings are recorded by the caller through observe_upstream().
+
+# Histogram bucket upper bounds in seconds, 0.5ms to ~2 minutes in steps of 1.5x
+BUCKETS = [0.0005 * 1.5 ** i for i in range(32)]
+# Time constant of the load average, like the 1 minute unix load average
+LOAD_WINDOW = 60.0
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile (0 < q < 1)."""
+        if not self.count:
+            return 0.0
+        rank = math.ceil(q * self.count)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(BUCKETS[index], self.max) if index < len(BUCKETS) else self.max
+        return self.max
+
+    def summary(self) -> dict[str, float]:
+        return {
+            "count": self.count,
+            "mean_ms": round(1000 * self.sum / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(1000 * self.percentile(0.50), 3),
+            "p95_ms": round(1000 * self.percentile(0.95), 3),
+            "p99_ms": round(1000 * self.percentile(0.99), 3),
+            "max_ms": round(1000 * self.max, 3),
+        }
+
+
+class CallStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.latency = Histogram()
+
+    def observe(self, seconds: float, error: bool):
+        self.calls += 1
+        self.errors += error
+        self.latency.observe(seconds)
+
+    def summary(self) -> dict[str, Any]:
+        return {"calls": self.calls, "errors": self.errors, "latency": self.latency.summary()}
+
+
+class Metrics:
+    def __init__(self):
+        self.started_at = time.time()
+        # (kind, name) -> stats, kind is tool, resource or prompt
+        self.handlers: dict[tuple[str, str], CallStats] = {}
+        # (service, endpoint) -> stats
+        self.upstream: dict[tuple[str, str], CallStats] = {}
+        self.in_flight = 0
+        self._load = 0.0
+        self._load_updated = time.monotonic()
+        # name -> callable returning a dict, e.g. cache and connection pool statistics
+        self.sources: dict[str, Callable[[], dict[str, Any]]] = {}
+
+    def _update_load(self):
+        # In flight count is constant between two updates, so decay exactly over the elapsed time
+        now = time.monotonic()
+        decay = math.exp(-(now - self._load_updated) / LOAD_WINDOW)
+        self._load = self._load * decay + self.in_flight * (1 - decay)
+        self._load_updated = now
+
+    def request_started(self):
+        self._update_load()
+        self.in_flight += 1
+
+    def request_finished(self, kind: str, name: str, seconds: float, error: bool):
+        self._update_load()
+        self.in_flight -= 1
+        self.handlers.setdefault((kind, name), CallStats()).observe(seconds, error)
+
+    def observe_upstream(self, service: str, endpoint: str, seconds: float, error: bool):
+        self.upstream.setdefault((service, endpoint), CallStats()).observe(seconds, error)
+
+    def load(self) -> float:
+        """Exponentially decayed average of in-flight requests over the last minute."""
+        self._update_load()
+        return self._load
+
+    def snapshot(self) -> dict[str, Any]:
+        handlers: dict[str, dict[str, Any]] = {}
+        for (kind, name), stats in sorted(self.handlers.items()):
+            handlers.setdefault(kind, {})[name] = stats.summary()
+        return {
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "in_flight": self.in_flight,
+            "load": round(self.load(), 3),
+            "handlers": handlers,
+            "upstream": {f"{service} {endpoint}": stats.summary() for (service, endpoint), stats in sorted(self.upstream.items())},
+            **{name: source() for name, source in self.sources.items()},
+        }
+
+    def prometheus_text(self) -> str:
+        """Metrics in the Prometheus text exposition format."""
+        lines = [
+            "# TYPE mcp_in_flight_requests gauge",
+            f"mcp_in_flight_requests {self.in_flight}",
+            "# TYPE mcp_load gauge",
+            f"mcp_load {self.load():.6f}",
+        ]
+        for metric, series in (("mcp_handler", self.handlers), ("mcp_upstream", self.upstream)):
+            first, second = ("kind", "name") if metric == "mcp_handler" else ("service", "endpoint")
+            labelled = [(f'{first}="{a}",{second}="{_escape(b)}"', stats) for (a, b), stats in sorted(series.items())]
+            # Every metric family has to be one contiguous group
+            lines.append(f"# TYPE {metric}_calls_total counter")
+            lines += [f"{metric}_calls_total{{{labels}}} {stats.calls}" for labels, stats in labelled]
+            lines.append(f"# TYPE {metric}_errors_total counter")
+            lines += [f"{metric}_errors_total{{{labels}}} {stats.errors}" for labels, stats in labelled]
+            lines.append(f"# TYPE {metric}_latency_seconds histogram")
+            for labels, stats in labelled:
+                cumulative = 0
+                for bound, count in zip(BUCKETS, stats.latency.counts):
+                    cumulative += count
+                    lines.append(f'{metric}_latency_seconds_bucket{{{labels},le="{bound:.6g}"}} {cumulative}')
+                lines.append(f'{metric}_latency_seconds_bucket{{{labels},le="+Inf"}} {stats.latency.count}')
+                lines.append(f"{metric}_latency_seconds_sum{{{labels}}} {stats.latency.sum:.6f}")
+                lines.append(f"{metric}_latency_seconds_count{{{labels}}} {stats.latency.count}")
+        for name, source in self.sources.items():
+            for key, value in source().items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f"mcp_{name}_{key} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _resource_label(server, uri: str) -> str:
+    # Template reads are labelled by their template to keep the number of series bounded
+    resource_manager = server._resource_manager
+    if uri in resource_manager.get_resources():
+        return uri
+    for uri_template, template in resource_manager.get_templates().items():
+        if template.matches(uri) is not None:
+            return uri_template
+    return "unknown"
+
+
+def _name_label(registered, name: str) -> str:
+    # Names come from the client, calls to names the server does not have must not add a series each
+    return name if registered(name) else "unknown"
+
+
+def metrics_layer(server, metrics: Metrics):
+    """Request handler layer (see request_handlers.py) recording the tool, resource and prompt requests of a FastMCP server."""
+    labels = {
+        types.CallToolRequest: ("tool", lambda req: _name_label(server._tool_manager.has_tool, req.params.name)),
+        types.ReadResourceRequest: ("resource", lambda req: _resource_label(server, str(req.params.uri))),
+        types.GetPromptRequest: ("prompt", lambda req: _name_label(server._prompt_manager.has_prompt, req.params.name)),
+    }
+
+    async def instrumented(req, handler):
+        kind, label = labels[type(req)]
+        metrics.request_started()
+        start = time.perf_counter()
+        error = True
+        try:
+            result = await handler(req)
+            # Tool exceptions are turned into an isError result rather than raised
+            error = bool(getattr(result.root, "isError", False))
+            return result
+        finally:
+            metrics.request_finished(kind, label(req), time.perf_counter() - start, error)
+
+    return instrumented
@@ -0,0 +1,273 @@
+import asyncio
+import logging
+import re
+from typing import Any
+
+import anyio
+import httpx
+from fastmcp import Client
+from fastmcp.exceptions import ClientError
+from mcp.shared.exceptions import McpError
+
+logger = logging.getLogger(__name__)
+
+# Multi-server MCP client
+# Connects to a configurable set of MCP endpoints (SSE urls or stdio server scripts), merges their
+# tool/resource/prompt catalogs and routes each call to a server that offers it.
+# Replicas offering the same tool share the calls by least outstanding requests, a background
+# health check pings every replica. A call fails over to the next healthy replica only when it never reached
+# the server, tool calls may have side effects and must not run twice. Resource reads and prompts, which have
+# none, also fail over when the connection is lost while they are in flight.
+HEALTH_CHECK_INTERVAL = 10.0
+HEALTH_CHECK_TIMEOUT = 5.0
+CONNECT_TIMEOUT = 10.0
+# Errors meaning the request never reached the replica: the connection could not be made, or the session's
+# write stream was already closed when the request was sent. Timeouts, resets and a closed response stream all
+# may come after the server ran the call, so they are not in here.
+NOT_SENT_ERRORS = (ConnectionRefusedError, httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout,
+                   anyio.ClosedResourceError, anyio.BrokenResourceError)
+
+
+class ReplicaLostError(ConnectionError):
+    """The connection to a replica was lost while a call was in flight, the call may or may not have run."""
+
+
+def _never_sent(error: BaseException) -> bool:
+    if isinstance(error, BaseExceptionGroup):
+        # The transports run in task groups, the error may come wrapped
+        return all(_never_sent(inner) for inner in error.exceptions)
+    return isinstance(error, NOT_SENT_ERRORS)
+
+
+def _template_regex(uri_template: str) -> re.Pattern:
+    """animal://{animal_name} -> ^animal://(?P<animal_name>[^/]+)$"""
+    parts = re.split(r"\{(\w+)\}", uri_template)
+    pattern = "".join(re.escape(part) if i % 2 == 0 else f"(?P<{part}>[^/]+)" for i, part in enumerate(parts))
+    return re.compile(f"^{pattern}$")
+
+
+class ServerReplica:
+    """One MCP endpoint, its connection is owned by a supervising task that reconnects after failures."""
+
+    def __init__(self, target: str, **client_kwargs):
+        self.target = target
+        self.client = Client(target, **client_kwargs)
+        self.healthy = False
+        self.outstanding = 0
+        self.calls = 0
+        self.failures = 0
+        self.tools: dict[str, Any] = {}
+        self.resources: dict[str, Any] = {}
+        self.templates: dict[str, Any] = {}
+        self.template_patterns: list[re.Pattern] = []
+        self.prompts: dict[str, Any] = {}
+        self.ready = asyncio.Event()
+        # Set while the connection to the replica is lost, in flight calls watch it to fail over instead of hanging.
+        # Unlike healthy it is not touched by slow health checks, a call that may have reached the server stays put.
+        self.down = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._failed = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        # Fresh events, so the client can be entered again after it was exited
+        self.ready = asyncio.Event()
+        self.down = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._failed = asyncio.Event()
+        self._task = asyncio.create_task(self._supervise())
+
+    async def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            await self._task
+
+    def _set_healthy(self, healthy: bool):
+        self.healthy = healthy
+        if healthy:
+            self.down.clear()
+        else:
+            self.down.set()
+
+    def mark_failed(self):
+        self._set_healthy(False)
+        self.failures += 1
+        self._failed.set()
+
+    def serves_resource(self, uri: str) -> bool:
+        return uri in self.resources or any(pattern.match(uri) for pattern in self.template_patterns)
+
+    async def _refresh_catalog(self):
+        self.tools = {tool.name: tool for tool in await self.client.list_tools()}
+        self.resources = {str(resource.uri): resource for resource in await self.client.list_resources()}
+        self.templates = {template.uriTemplate: template for template in await self.client.list_resource_templates()}
+        self.template_patterns = [_template_regex(uri_template) for uri_template in self.templates]
+        self.prompts = {prompt.name: prompt for prompt in await self.client.list_prompts()}
+
+    async def _wait(self, event: asyncio.Event, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def _supervise(self):
+        while not self._stop.is_set():
+            try:
+                async with self.client:
+                    await self._refresh_catalog()
+                    self._failed.clear()
+                    self._set_healthy(True)
+                    self.ready.set()
+                    logger.info("Connected to MCP server %s", self.target)
+                    while not self._stop.is_set():
+                        if await self._wait(self._failed, HEALTH_CHECK_INTERVAL):
+                            break
+                        try:
+                            await asyncio.wait_for(self.client.ping(), HEALTH_CHECK_TIMEOUT)
+                        except TimeoutError:
+                            # A busy server (or a blocked event loop on either side) is not a lost connection:
+                            # new calls go to the other replicas, the session and its in flight calls are kept
+                            if self.healthy:
+                                logger.warning("MCP server %s did not answer the health check in time", self.target)
+                            self.healthy = False
+                            continue
+                        if not self.healthy:
+                            logger.info("MCP server %s answers health checks again", self.target)
+                            self._set_healthy(True)
+            except Exception as e:
+                logger.warning("MCP server %s is unhealthy: %s", self.target, e)
+            self._set_healthy(False)
+            # The first connection attempt is over, whatever its outcome
+            self.ready.set()
+            if not self._stop.is_set():
+                await self._wait(self._stop, HEALTH_CHECK_INTERVAL)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "target": self.target,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "calls": self.calls,
+            "failures": self.failures,
+        }
+
+
+class MultiServerClient:
+    """Drop-in replacement for fastmcp.Client that talks to several MCP servers at once."""
+
+    def __init__(self, targets: list[str], **client_kwargs):
+        if not targets:
+            raise ValueError("At least one MCP server is required")
+        self.replicas = [ServerReplica(target, **client_kwargs) for target in targets]
+        self._round_robin = 0
+
+    async def __aenter__(self):
+        for replica in self.replicas:
+            replica.start()
+        await asyncio.wait(
+            [asyncio.create_task(replica.ready.wait()) for replica in self.replicas],
+            timeout=CONNECT_TIMEOUT,
+        )
+        if not self.is_connected():
+            await self.__aexit__(None, None, None)
+            raise RuntimeError(f"Could not connect to any MCP server: {[r.target for r in self.replicas]}")
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await asyncio.gather(*(replica.stop() for replica in self.replicas))
+
+    def is_connected(self) -> bool:
+        return any(replica.healthy for replica in self.replicas)
+
+    def stats(self) -> list[dict[str, Any]]:
+        return [replica.stats() for replica in self.replicas]
+
+    # --- Catalogs, merged over the healthy replicas ---
+
+    def _merge(self, catalog: str) -> list[Any]:
+        merged = {}
+        for replica in self.replicas:
+            if replica.healthy:
+                for key, item in getattr(replica, catalog).items():
+                    merged.setdefault(key, item)
+        return list(merged.values())
+
+    async def list_tools(self):
+        return self._merge("tools")
+
+    async def list_resources(self):
+        return self._merge("resources")
+
+    async def list_resource_templates(self):
+        return self._merge("templates")
+
+    async def list_prompts(self):
+        return self._merge("prompts")
+
+    # --- Routing ---
+
+    def _pick(self, candidates: list[ServerReplica]) -> ServerReplica | None:
+        healthy = [replica for replica in candidates if replica.healthy]
+        if not healthy:
+            return None
+        # Least outstanding requests, round robin between replicas that are equally busy
+        self._round_robin += 1
+        least = min(replica.outstanding for replica in healthy)
+        idle = [replica for replica in healthy if replica.outstanding == least]
+        return idle[self._round_robin % len(idle)]
+
+    async def _route(self, description: str, candidates: list[ServerReplica], call, idempotent: bool = False):
+        tried = set()
+        while True:
+            replica = self._pick([r for r in candidates if r.target not in tried])
+            if replica is None:
+                raise RuntimeError(f"No healthy MCP server available for {description}")
+            tried.add(replica.target)
+            replica.outstanding += 1
+            replica.calls += 1
+            try:
+                return await self._call_while_healthy(replica, call)
+            except ReplicaLostError as e:
+                # The replica is being reconnected already, only a call without side effects may run again
+                if not idempotent:
+                    raise
+                logger.warning("%s failed on %s, failing over: %s", description, replica.target, e)
+            except Exception as e:
+                # ClientError/McpError: the server answered, the request itself failed. Anything else
+                # may have happened after the call ran. Nothing to fail over either way.
+                if isinstance(e, (ClientError, McpError)) or not _never_sent(e):
+                    raise
+                logger.warning("%s failed on %s, failing over: %s", description, replica.target, e)
+                replica.mark_failed()
+            finally:
+                replica.outstanding -= 1
+
+    async def _call_while_healthy(self, replica: ServerReplica, call):
+        # A dead SSE server never answers, so stop waiting as soon as its connection is lost
+        call_task = asyncio.ensure_future(call(replica.client))
+        down_task = asyncio.ensure_future(replica.down.wait())
+        try:
+            await asyncio.wait({call_task, down_task}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            down_task.cancel()
+            if not call_task.done():
+                call_task.cancel()
+        if call_task.done() and not call_task.cancelled():
+            return call_task.result()
+        raise ReplicaLostError(f"MCP server {replica.target} went down")
+
+    async def call_tool(self, name: str, arguments: dict[str, Any] | None = None):
+        candidates = [replica for replica in self.replicas if name in replica.tools]
+        return await self._route(f"tool {name}", candidates, lambda client: client.call_tool(name, arguments))
+
+    async def read_resource(self, uri):
+        uri = str(uri)
+        candidates = [replica for replica in self.replicas if replica.serves_resource(uri)]
+        return await self._route(f"resource {uri}", candidates, lambda client: client.read_resource(uri),
+                                 idempotent=True)
+
+    async def get_prompt(self, name: str, arguments: dict[str, str] | None = None):
+        candidates = [replica for replica in self.replicas if name in replica.prompts]
+        return await self._route(f"prompt {name}", candidates, lambda client: client.get_prompt(name, arguments),
+                                 idempotent=True)
@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import os
+import time
+import weakref
+from typing import Any
+
+from mcp.server.lowlevel.server import request_ctx
+
+logger = logging.getLogger(__name__)
+
+# Coalescing of the log and progress notifications tools send to the client
+# Log messages of a session are batched, the first one starts a timer and everything logged until it fires
+# goes out as one notification (one line per message). Progress updates are dropped when they repeat the last
+# value or come sooner than the minimum interval after the last one sent, the final update is always sent.
+#   MCP_CLIENT_LOGS          off disables the log notifications altogether
+#   MCP_CLIENT_LOG_INTERVAL  seconds a log batch is held (default 0.2), 0 sends every message on its own
+#   MCP_CLIENT_LOG_BATCH     messages after which a batch goes out right away (default 50)
+#   MCP_PROGRESS_INTERVAL    minimum seconds between two progress notifications of a request (default 0.25)
+CLIENT_LOGS = os.environ.get("MCP_CLIENT_LOGS", "on").lower() != "off"
+CLIENT_LOG_INTERVAL = float(os.environ.get("MCP_CLIENT_LOG_INTERVAL", "0.2"))
+CLIENT_LOG_BATCH = int(os.environ.get("MCP_CLIENT_LOG_BATCH", "50"))
+PROGRESS_INTERVAL = float(os.environ.get("MCP_PROGRESS_INTERVAL", "0.25"))
+
+
+class LogBatcher:
+    def __init__(self, interval: float = CLIENT_LOG_INTERVAL, max_batch: int = CLIENT_LOG_BATCH):
+        self.interval = interval
+        self.max_batch = max_batch
+        # Pending messages per client session, dropped together with the session
+        self._pending: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        # The one flush timer of every session with a pending batch
+        self._timers: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        # Keeps the flush tasks referenced until they ran
+        self._tasks: set[asyncio.Task] = set()
+        self.messages = 0
+        self.notifications = 0
+
+    async def log(self, ctx, message: str):
+        self.messages += 1
+        if self.interval <= 0:
+            self.notifications += 1
+            await ctx.info(message)
+            return
+        session = ctx.request_context.session
+        batch = self._pending.get(session)
+        if batch is None:
+            batch = self._pending[session] = []
+            task = self._timers[session] = asyncio.create_task(self._flush_later(session))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        batch.append(message)
+        if len(batch) >= self.max_batch:
+            await self.flush(session)
+
+    async def _flush_later(self, session):
+        await asyncio.sleep(self.interval)
+        await self.flush(session)
+
+    async def flush(self, session):
+        batch = self._pending.pop(session, None)
+        timer = self._timers.pop(session, None)
+        if timer is not None and timer is not asyncio.current_task():
+            # Flushed early (full batch), the timer would otherwise flush the next batch too soon
+            timer.cancel()
+        if not batch:
+            return
+        self.notifications += 1
+        try:
+            await session.send_log_message(level="info", data="\n".join(batch))
+        except Exception as e:
+            # The session went away while the batch was held
+            logger.debug("Dropped %d client log messages: %s", len(batch), e)
+
+
+class ProgressThrottle:
+    def __init__(self, min_interval: float = PROGRESS_INTERVAL):
+        self.min_interval = min_interval
+        # session -> {progress token: (last progress sent, when)}
+        self._last: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self.reports = 0
+        self.notifications = 0
+
+    async def report(self, ctx, progress: float, total: float | None = None):
+        meta = ctx.request_context.meta
+        token = meta.progressToken if meta else None
+        if token is None:
+            # Same as ctx.report_progress, the client did not ask for progress
+            return
+        self.reports += 1
+        session = ctx.request_context.session
+        requests = self._last.setdefault(session, {})
+        last = requests.get(token)
+        now = time.monotonic()
+        final = total is not None and progress >= total
+        if not final and last is not None and (progress == last[0] or now - last[1] < self.min_interval):
+            return
+        if final:
+            requests.pop(token, None)
+        else:
+            requests[token] = (progress, now)
+        self.notifications += 1
+        await session.send_progress_notification(progress_token=token, progress=progress, total=total)
+
+    def finish(self, session, token):
+        """Forget a request's progress, it has completed whether or not its final update was sent."""
+        requests = self._last.get(session)
+        if requests is not None:
+            requests.pop(token, None)
+
+
+log_batcher = LogBatcher()
+progress_throttle = ProgressThrottle()
+
+
+async def client_log(ctx, message: str) -> None:
+    """Send an info log message to the client, batched with the session's other messages, unless MCP_CLIENT_LOGS=off."""
+    if CLIENT_LOGS:
+        await log_batcher.log(ctx, message)
+
+
+async def report_progress(ctx, progress: float, total: float | None = None) -> None:
+    """ctx.report_progress, throttled to MCP_PROGRESS_INTERVAL and only when the progress changed."""
+    await progress_throttle.report(ctx, progress, total)
+
+
+async def progress_layer(req, handler):
+    """Request handler layer (see request_handlers.py) dropping the progress state of a request once it completes."""
+    try:
+        return await handler(req)
+    finally:
+        meta = req.params.meta
+        if meta is not None and meta.progressToken is not None:
+            progress_throttle.finish(request_ctx.get().session, meta.progressToken)
+
+
+def stats() -> dict[str, Any]:
+    return {
+        "log_messages": log_batcher.messages,
+        "log_notifications": log_batcher.notifications,
+        "progress_reports": progress_throttle.reports,
+        "progress_notifications": progress_throttle.notifications,
+    }
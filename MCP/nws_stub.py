@@ -0,0 +1,147 @@
+import argparse
+import asyncio
+import math
+import random
+import time
+from datetime import datetime, timezone
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+# Local stand-in for api.weather.gov, for benchmarks and offline runs
+# Serves the endpoints server.py uses with canned data, with configurable latency and error injection.
+# Point the server at it with NWS_API_BASE=http://127.0.0.1:<port>
+STATES_WITH_ALERTS = 5
+ALERTS_PER_STATE = 8
+FORECAST_PERIODS = 14
+# Gridpoint series cover a week from a few hours ago, like the real ones
+GRID_HOURS = 7 * 24
+GRID_PAST_HOURS = 6
+
+
+def _alert(state: str, index: int) -> dict:
+    return {
+        "properties": {
+            "event": ["Wind Advisory", "Flood Watch", "Heat Advisory", "Winter Storm Warning"][index % 4],
+            "areaDesc": f"County {index}; County {index + 1}, {state}",
+            "severity": ["Minor", "Moderate", "Severe", "Extreme"][index % 4],
+            "description": "Strong winds and heavy rain are expected in the area through the evening. " * 6,
+            "instruction": "Secure outdoor objects and avoid unnecessary travel.",
+        }
+    }
+
+
+def _period(number: int) -> dict:
+    daytime = number % 2 == 1
+    return {
+        "number": number,
+        "name": f"Period {number}",
+        "isDaytime": daytime,
+        "temperature": 60 + number if daytime else 45 + number,
+        "temperatureUnit": "F",
+        "windSpeed": f"{5 + number} mph",
+        "windDirection": "SW",
+        "shortForecast": "Chance Rain Showers",
+        "detailedForecast": "A chance of rain showers. Mostly cloudy, with a high near 62. Southwest wind 5 to 10 mph. " * 2,
+    }
+
+
+def _iso_hour(hour: int) -> str:
+    return datetime.fromtimestamp(hour * 3600, timezone.utc).isoformat()
+
+
+def _layer(uom: str, start: int, step: int, value) -> dict:
+    # One entry per step hours, the real data merges runs of equal values into longer intervals the same way
+    return {
+        "uom": uom,
+        "values": [
+            {"validTime": f"{_iso_hour(start + hour)}/PT{step}H", "value": value(hour)}
+            for hour in range(0, GRID_HOURS, step)
+        ],
+    }
+
+
+def _gridpoint(grid: str) -> dict:
+    rng = random.Random(grid)
+    start = math.floor(time.time() / 3600) - GRID_PAST_HOURS
+    base = rng.uniform(5, 20)
+    return {
+        "properties": {
+            "updateTime": _iso_hour(start),
+            "validTimes": f"{_iso_hour(start)}/P7DT0H",
+            # Daily cycle around base, warmest in the afternoon (UTC-8)
+            "temperature": _layer("wmoUnit:degC", start, 1,
+                                  lambda hour: round(base + 6 * math.sin(2 * math.pi * ((start + hour - 17) % 24) / 24), 1)),
+            "windSpeed": _layer("wmoUnit:km_h-1", start, 2, lambda hour: round(rng.uniform(5, 30), 1)),
+            "windGust": _layer("wmoUnit:km_h-1", start, 3, lambda hour: round(rng.uniform(15, 50), 1)),
+            "probabilityOfPrecipitation": _layer("wmoUnit:percent", start, 6, lambda hour: rng.choice([0, 10, 20, 40, 70])),
+            "quantitativePrecipitation": _layer("wmoUnit:mm", start, 6, lambda hour: round(rng.choice([0, 0, 0.5, 2.0, 5.0]), 1)),
+            "snowfallAmount": _layer("wmoUnit:mm", start, 24, lambda hour: 0),
+        }
+    }
+
+
+def create_app(latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0) -> Starlette:
+    """NWS stub app, every response is delayed by latency_ms (+/- jitter_ms) and fails with 503 at error_rate."""
+
+    async def inject(request: Request) -> JSONResponse | None:
+        delay = latency_ms + random.uniform(-jitter_ms, jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if error_rate and random.random() < error_rate:
+            return JSONResponse({"title": "Service Unavailable"}, status_code=503)
+        return None
+
+    async def points(request: Request):
+        if error := await inject(request):
+            return error
+        latitude, longitude = request.path_params["coordinates"].split(",")
+        grid_x, grid_y = int(abs(float(latitude)) * 10) % 200, int(abs(float(longitude)) * 10) % 200
+        base = str(request.base_url).rstrip("/")
+        return JSONResponse({
+            "properties": {
+                "gridId": "SEW",
+                "gridX": grid_x,
+                "gridY": grid_y,
+                "forecast": f"{base}/gridpoints/SEW/{grid_x},{grid_y}/forecast",
+                "forecastGridData": f"{base}/gridpoints/SEW/{grid_x},{grid_y}",
+            }
+        })
+
+    async def forecast(request: Request):
+        if error := await inject(request):
+            return error
+        return JSONResponse({"properties": {"periods": [_period(number) for number in range(1, FORECAST_PERIODS + 1)]}})
+
+    async def gridpoint(request: Request):
+        if error := await inject(request):
+            return error
+        return JSONResponse(_gridpoint(request.path_params["grid"]))
+
+    async def alerts(request: Request):
+        if error := await inject(request):
+            return error
+        state = request.path_params["state"].upper()
+        count = ALERTS_PER_STATE if sum(map(ord, state)) % 10 < STATES_WITH_ALERTS else 0
+        return JSONResponse({"features": [_alert(state, index) for index in range(count)]})
+
+    return Starlette(routes=[
+        Route("/points/{coordinates}", points),
+        Route("/gridpoints/{office}/{grid}/forecast", forecast),
+        Route("/gridpoints/{office}/{grid}", gridpoint),
+        Route("/alerts/active/area/{state}", alerts),
+    ])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local NWS API stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.latency_ms, args.jitter_ms, args.error_rate), host=args.host, port=args.port, log_level="warning")
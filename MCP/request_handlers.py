@@ -0,0 +1,27 @@
+from typing import Any, Awaitable, Callable
+
+import mcp.types as types
+
+# Layers around the low level request handlers of a FastMCP server
+# Every tool call, resource read and prompt request goes through these handlers. Metrics, admission control
+# and the notification cleanup each provide a layer, an async (req, handler) -> result that awaits handler(req)
+# somewhere in between. wrap_request_handlers() stacks them, so their order is set in one call.
+REQUEST_TYPES = (types.CallToolRequest, types.ReadResourceRequest, types.GetPromptRequest)
+
+Layer = Callable[[Any, Callable[[Any], Awaitable[Any]]], Awaitable[Any]]
+
+
+def _bind(layer: Layer, handler):
+    async def wrapped(req):
+        return await layer(req, handler)
+    return wrapped
+
+
+def wrap_request_handlers(server, *layers: Layer) -> None:
+    """Wrap the tool, resource and prompt request handlers of a FastMCP server in layers, the first one outermost."""
+    handlers = server._mcp_server.request_handlers
+    for request_type in REQUEST_TYPES:
+        handler = handlers[request_type]
+        for layer in reversed(layers):
+            handler = _bind(layer, handler)
+        handlers[request_type] = handler
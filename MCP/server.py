@@ -1,120 +1,377 @@
-from typing import Any, Dict, Tuple
+from typing import TYPE_CHECKING, Any, Literal, Tuple
+import argparse
+import asyncio
+import importlib
+import math
 import os
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
 from pathlib import Path
-import httpx
-from PIL import Image as PILImage
 from io import BytesIO
 from mcp.types import PromptMessage
 from fastmcp import FastMCP, Context, Image as MCPImage
 from fastmcp.prompts.prompt import Message, TextContent
+from fastmcp.utilities.http import RequestMiddleware
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
 import base64
-import logging
-
-
-class bcolors:
-    HEADER = '\033[95m'
-    OKBLUE = '\033[94m'
-    OKCYAN = '\033[96m'
-    OKGREEN = '\033[92m'
-    WARNING = '\033[93m'
-    FAIL = '\033[91m'
-    ENDC = '\033[0m'
-    BOLD = '\033[1m'
-    UNDERLINE = '\033[4m'
-logging.basicConfig(level=logging.DEBUG)
-mcp = FastMCP(name="Tutorial Server")
+import pydantic_core
+from cache import InMemoryCache, create_cache
+from logging_config import configure_logging
+from notifications import client_log, progress_layer, report_progress, stats as notification_stats
+from metrics import Metrics, metrics_layer
+from admission import AdmissionController, admission_layer
+from request_handlers import wrap_request_handlers
+
+# httpx, PIL and uvicorn are imported where they are first used, with stdio a server process is started
+# for every session and most sessions never touch images or the NWS API
+if TYPE_CHECKING:
+    import httpx
+
+# MCP_PREWARM=on loads PIL and opens the NWS connection in the background as soon as a session starts,
+# so that work overlaps the initialize handshake instead of delaying the first tool call
+PREWARM = os.environ.get("MCP_PREWARM", "off").lower() == "on"
+_prewarm_task: asyncio.Task | None = None
+
+
+async def prewarm():
+    try:
+        # Not gridpoints: NumPy is only needed by get_forecast_stats and would slow down every other session's start
+        await asyncio.to_thread(importlib.import_module, "PIL.Image")
+        await get_http_client().head(NWS_API_BASE)
+    except Exception:
+        # Only a head start, the real requests report their own errors
+        pass
+
+
+@asynccontextmanager
+async def lifespan(server):
+    global _prewarm_task
+    # Once per process, an SSE server enters the lifespan for every session
+    if PREWARM and _prewarm_task is None:
+        _prewarm_task = asyncio.create_task(prewarm())
+    yield {}
+
+
+def compact_json(value: Any) -> str:
+    """JSON without indentation, FastMCP's default serialization indents by 2 spaces."""
+    return pydantic_core.to_json(value, fallback=str).decode()
+
+
+# Non-string tool results are serialized compactly, every padding byte ends up in the model's prompt
+mcp = FastMCP(name="Tutorial Server", lifespan=lifespan, tool_serializer=compact_json)
+# Queue based logging pipeline, levels/format/sampling are set through MCP_LOG_* environment variables
+configure_logging()
+# Forecast/alert/thumbnail cache, MCP_CACHE_BACKEND=sqlite shares it between the workers of the multi-worker mode
+cache = create_cache()
+# Per-client rate limits, per-tool concurrency caps and a bounded priority queue, configured through MCP_* environment variables
+admission = AdmissionController()
+# Call counts, errors and latency histograms of every tool/resource/prompt, published on system://metrics
+metrics = Metrics()
+# Every tool/resource/prompt request goes through these layers, outermost first:
+#   metrics, around admission control so queueing time and rejections show up in the latencies and errors
+#   admission control
+#   progress cleanup, drops the progress throttling state of a request once it completes
+wrap_request_handlers(mcp, metrics_layer(mcp, metrics), admission_layer(mcp, admission), progress_layer)
+metrics.sources["admission"] = admission.stats
 
 ############################## Tool ##############################
 # Constants
-NWS_API_BASE = "https://api.weather.gov"
+# Overridable to point the server at a local stub (see nws_stub.py)
+NWS_API_BASE = os.environ.get("NWS_API_BASE", "https://api.weather.gov")
 USER_AGENT = "weather-app/1.0"
-
-
-async def make_nws_request(url: str) -> dict[str, Any] | None:
-    """Make a request to the NWS API with proper error handling."""
-    headers = {
-        "User-Agent": USER_AGENT,
-        "Accept": "application/geo+json"
-    }
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(url, headers=headers, timeout=30.0)
-            response.raise_for_status()
-            return response.json()
-        except Exception:
-            return None
-
-def format_alert(feature: dict) -> str:
+# One client for all NWS requests so connections are pooled and reused across calls
+http_client: "httpx.AsyncClient | None" = None
+# Cache lifetimes in seconds, a location's grid point practically never changes
+POINTS_CACHE_TTL = 24 * 60 * 60
+FORECAST_CACHE_TTL = 10 * 60
+ALERTS_CACHE_TTL = 60
+THUMBNAIL_CACHE_TTL = 60 * 60
+# Default output of get_forecast/get_alerts, text or json (compact, selected fields)
+TOOL_OUTPUT = os.environ.get("MCP_TOOL_OUTPUT", "text")
+if TOOL_OUTPUT not in ("text", "json"):
+    raise ValueError(f"Unknown MCP_TOOL_OUTPUT: {TOOL_OUTPUT} (expected text or json)")
+# Decoded gridpoint arrays per grid cell, NumPy arrays are not JSON serializable so this one is per process
+# (the raw gridpoint responses are in the shared cache)
+grid_cache = InMemoryCache(max_entries=256)
+MAX_STATS_LOCATIONS = 50
+MAX_STATS_HOURS = 7 * 24
+
+
+def get_http_client() -> "httpx.AsyncClient":
+    global http_client
+    if http_client is None:
+        import httpx
+        http_client = httpx.AsyncClient(
+            headers={"User-Agent": USER_AGENT, "Accept": "application/geo+json"},
+            timeout=30.0,
+        )
+    return http_client
+
+def http_pool_stats() -> dict[str, int]:
+    """Open and idle connections of the NWS connection pool."""
+    pool = getattr(getattr(http_client, "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", []))
+    return {"connections": len(connections), "idle": sum(connection.is_idle() for connection in connections)}
+
+metrics.sources["cache"] = lambda: cache.stats()
+metrics.sources["http_pool"] = http_pool_stats
+metrics.sources["grid_cache"] = lambda: grid_cache.stats()
+metrics.sources["notifications"] = notification_stats
+
+async def make_nws_request(url: str, ttl: float = 0) -> dict[str, Any] | None:
+    """Make a request to the NWS API with proper error handling, successful responses are cached for ttl seconds."""
+    cache_key = f"nws:{url}"
+    if ttl:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+    # points, gridpoints, alerts, ...
+    endpoint = urlparse(url).path.split("/")[1]
+    start = time.perf_counter()
+    try:
+        response = await get_http_client().get(url)
+        response.raise_for_status()
+        data = response.json()
+    except Exception:
+        metrics.observe_upstream("nws", endpoint, time.perf_counter() - start, error=True)
+        return None
+    metrics.observe_upstream("nws", endpoint, time.perf_counter() - start, error=False)
+    if ttl:
+        cache.set(cache_key, data, ttl)
+    return data
+
+def truncate(text: str | None, max_length: int) -> str | None:
+    """Collapse whitespace (NWS texts are hard wrapped) and cut to at most max_length characters
+    at a word boundary, 0 keeps the whole text."""
+    if not text:
+        return text
+    text = " ".join(text.split())
+    if max_length <= 0 or len(text) <= max_length:
+        return text
+    return text[:max_length - 1].rsplit(" ", 1)[0] + "…"
+
+def format_alert(feature: dict, max_description_length: int = 0) -> str:
     """Format an alert feature into a readable string."""
     props = feature["properties"]
     return f"""
 Event: {props.get('event', 'Unknown')}
 Area: {props.get('areaDesc', 'Unknown')}
 Severity: {props.get('severity', 'Unknown')}
-Description: {props.get('description', 'No description available')}
-Instructions: {props.get('instruction', 'No specific instructions provided')}
+Description: {truncate(props.get('description'), max_description_length) or 'No description available'}
+Instructions: {truncate(props.get('instruction'), max_description_length) or 'No specific instructions provided'}
 """
 
+def alert_fields(feature: dict, max_description_length: int = 0) -> dict[str, Any]:
+    """Selected fields of an alert feature for the json output."""
+    props = feature["properties"]
+    return {
+        "event": props.get("event"),
+        "area": props.get("areaDesc"),
+        "severity": props.get("severity"),
+        "description": truncate(props.get("description"), max_description_length),
+        "instruction": truncate(props.get("instruction"), max_description_length),
+    }
+
+def alert_matches(feature: dict, severities: set[str], event: str, area: str) -> bool:
+    props = feature["properties"]
+    if severities and (props.get("severity") or "").lower() not in severities:
+        return False
+    if event and event.lower() not in (props.get("event") or "").lower():
+        return False
+    return not area or area.lower() in (props.get("areaDesc") or "").lower()
+
 @mcp.tool()
-async def get_alerts(state: str) -> str:
+async def get_alerts(
+    state: str,
+    severity: str = "",
+    event: str = "",
+    area: str = "",
+    limit: int = 0,
+    output: Literal["text", "json"] = TOOL_OUTPUT,
+    max_description_length: int = 0,
+) -> str:
     """Get weather alerts for a US state.
 
     Args:
         state: Two-letter US state code (e.g. CA, NY)
+        severity: Only these severities, comma separated (Minor, Moderate, Severe, Extreme)
+        event: Only alerts whose event contains this text (e.g. Flood)
+        area: Only alerts whose area description contains this text (e.g. a county name)
+        limit: Return at most this many alerts, 0 for all
+        output: text, or json for compact JSON with the matching total and the selected alerts
+        max_description_length: Cut descriptions and instructions to this many characters, 0 keeps them whole
     """
     url = f"{NWS_API_BASE}/alerts/active/area/{state}"
-    data = await make_nws_request(url)
+    data = await make_nws_request(url, ttl=ALERTS_CACHE_TTL)
 
     if not data or "features" not in data:
         return "Unable to fetch alerts or no alerts found."
 
+    severities = {value.strip().lower() for value in severity.split(",") if value.strip()}
+    features = [feature for feature in data["features"] if alert_matches(feature, severities, event, area)]
+    selected = features[:limit] if limit > 0 else features
+    if output == "json":
+        return compact_json({"total": len(features),
+                             "alerts": [alert_fields(feature, max_description_length) for feature in selected]})
+
     if not data["features"]:
         return "No active alerts for this state."
+    if not features:
+        return "No active alerts match the filters."
 
-    alerts = [format_alert(feature) for feature in data["features"]]
+    alerts = [format_alert(feature, max_description_length) for feature in selected]
     return "\n---\n".join(alerts)
 
 @mcp.tool()
-async def get_forecast(latitude: float, longitude: float, ctx: Context) -> str:
+async def get_forecast(
+    latitude: float,
+    longitude: float,
+    ctx: Context,
+    periods: int = 5,
+    output: Literal["text", "json"] = TOOL_OUTPUT,
+    max_description_length: int = 0,
+) -> str:
     """Get weather forecast for a location.
 
     Args:
         latitude: Latitude of the location
         longitude: Longitude of the location
+        periods: Number of forecast periods (half days) to return
+        output: text, or json for compact JSON with name, temperature, wind and forecast of every period
+        max_description_length: Cut the detailed forecast to this many characters, 0 keeps it whole
     """
     # roots = await ctx.list_roots()
-    # await ctx.info(f"{bcolors.HEADER}{roots}")
-    await ctx.info(f"{bcolors.OKGREEN}Info Message: Processing coordinates: {latitude}, {longitude}")
+    # await ctx.info(f"{roots}")
+    await client_log(ctx, f"Processing coordinates: {latitude}, {longitude}")
     # await ctx.report_progress(0, 100)
     # First get the forecast grid endpoint
     points_url = f"{NWS_API_BASE}/points/{latitude},{longitude}"
-    points_data = await make_nws_request(points_url)
+    points_data = await make_nws_request(points_url, ttl=POINTS_CACHE_TTL)
 
     if not points_data:
         return "Unable to fetch forecast data for this location."
 
     # Get the forecast URL from the points response
     forecast_url = points_data["properties"]["forecast"]
-    forecast_data = await make_nws_request(forecast_url)
+    forecast_data = await make_nws_request(forecast_url, ttl=FORECAST_CACHE_TTL)
 
     if not forecast_data:
         return "Unable to fetch detailed forecast."
 
-    await ctx.report_progress(50, 100)
+    await report_progress(ctx, 50, 100)
+    selected = forecast_data["properties"]["periods"][:max(periods, 1)]
+    await report_progress(ctx, 100, 100)
+    if output == "json":
+        return compact_json({"periods": [
+            {
+                "name": period["name"],
+                "temperature": period["temperature"],
+                "unit": period["temperatureUnit"],
+                "wind": f"{period['windSpeed']} {period['windDirection']}",
+                "forecast": truncate(period["detailedForecast"], max_description_length),
+            }
+            for period in selected
+        ]})
+
     # Format the periods into a readable forecast
-    periods = forecast_data["properties"]["periods"]
     forecasts = []
-    for period in periods[:5]:  # Only show next 5 periods
-        forecast = f"""
-                    {period['name']}:
-                    Temperature: {period['temperature']}°{period['temperatureUnit']}
-                    Wind: {period['windSpeed']} {period['windDirection']}
-                    Forecast: {period['detailedForecast']}
-                    """
+    for period in selected:
+        forecast = (
+            f"{period['name']}:\n"
+            f"Temperature: {period['temperature']}°{period['temperatureUnit']}\n"
+            f"Wind: {period['windSpeed']} {period['windDirection']}\n"
+            f"Forecast: {truncate(period['detailedForecast'], max_description_length)}"
+        )
         forecasts.append(forecast)
-    await ctx.report_progress(100, 100)
     return "\n---\n".join(forecasts)
 
+async def get_grid_cell(latitude: float, longitude: float) -> tuple[str, str] | None:
+    """Grid cell (e.g. SEW/124,67) holding a location and the url of its gridpoint data."""
+    points_data = await make_nws_request(f"{NWS_API_BASE}/points/{latitude},{longitude}", ttl=POINTS_CACHE_TTL)
+    if not points_data:
+        return None
+    props = points_data["properties"]
+    return f"{props['gridId']}/{props['gridX']},{props['gridY']}", props["forecastGridData"]
+
+async def get_grid(cell: str, url: str) -> dict[str, Any] | None:
+    """Decoded hourly gridpoint series of a grid cell."""
+    import gridpoints
+    grid = grid_cache.get(cell)
+    if grid is None:
+        # Only the layers decode_grid reads go into the shared cache, not the whole raw document
+        cache_key = f"nws:grid:{url}"
+        properties = cache.get(cache_key)
+        if properties is None:
+            grid_data = await make_nws_request(url)
+            if not grid_data:
+                return None
+            properties = gridpoints.grid_properties(grid_data["properties"])
+            cache.set(cache_key, properties, FORECAST_CACHE_TTL)
+        grid = gridpoints.decode_grid(properties)
+        grid_cache.set(cell, grid, FORECAST_CACHE_TTL)
+    return grid
+
+@mcp.tool()
+async def get_forecast_stats(
+    locations: list[list[float]],
+    hours: int = 72,
+    window_hours: int = 24,
+    units: Literal["us", "si"] = "us",
+    temperature_above: float | None = None,
+    temperature_below: float | None = None,
+    wind_speed_above: float | None = None,
+    precipitation_probability_above: float | None = None,
+) -> str:
+    """Hourly forecast statistics for one or many locations, as compact JSON.
+
+    For every window of window_hours over the next hours: min/max/mean temperature, max/mean wind speed,
+    max wind gust, max precipitation probability, precipitation and snowfall totals,
+    and the number of hours past the given thresholds.
+
+    Args:
+        locations: [[latitude, longitude], ...] of up to 50 locations
+        hours: Hours from now to cover, up to 168
+        window_hours: Length of each window in hours, e.g. 24 for daily statistics or equal to hours for one total
+        units: us (degF, mph, in) or si (degC, km/h, mm)
+        temperature_above: Count the hours warmer than this
+        temperature_below: Count the hours colder than this
+        wind_speed_above: Count the hours with more wind than this
+        precipitation_probability_above: Count the hours with a higher precipitation probability (percent)
+    """
+    import gridpoints
+    if not 1 <= len(locations) <= MAX_STATS_LOCATIONS or any(len(location) != 2 for location in locations):
+        return f"locations must be 1 to {MAX_STATS_LOCATIONS} [latitude, longitude] pairs."
+    hours = min(max(hours, 1), MAX_STATS_HOURS)
+    window_hours = min(max(window_hours, 1), hours)
+    thresholds = {
+        key: value for key, value in {
+            "temperature_above": temperature_above,
+            "temperature_below": temperature_below,
+            "wind_speed_above": wind_speed_above,
+            "precipitation_probability_above": precipitation_probability_above,
+        }.items() if value is not None
+    }
+
+    cells = await asyncio.gather(*(get_grid_cell(latitude, longitude) for latitude, longitude in locations))
+    # Locations in the same grid cell share the fetch and the decoded arrays
+    urls = dict(cell for cell in cells if cell is not None)
+    grids = dict(zip(urls, await asyncio.gather(*(get_grid(cell, url) for cell, url in urls.items()))))
+    found = [cell for cell, grid in grids.items() if grid is not None]
+    if not found:
+        return "Unable to fetch forecast data for these locations."
+    stats = gridpoints.window_stats([grids[cell] for cell in found], math.floor(time.time() / 3600), hours,
+                                    window_hours, us_units=units == "us", thresholds=thresholds)
+    windows = dict(zip(found, stats["windows"]))
+    results = []
+    for (latitude, longitude), cell in zip(locations, cells):
+        if cell is not None and cell[0] in windows:
+            results.append({"latitude": latitude, "longitude": longitude, "grid": cell[0], "windows": windows[cell[0]]})
+        else:
+            results.append({"latitude": latitude, "longitude": longitude, "error": "Unable to fetch forecast data for this location."})
+    return compact_json({"units": stats["units"], "locations": results})
+
 @mcp.tool()
 def create_thumbnail(image_path: str) -> Tuple[bytes, str]:
     """
@@ -131,6 +388,14 @@ def create_thumbnail(image_path: str) -> Tuple[bytes, str]:
           - The base64 encoded image data in bytes(can be used in HTML/CSS)
           - The MIME type of the image ("image/png")
     """
+    # Cached per file version, a changed file gets a new key
+    stat = os.stat(image_path)
+    cache_key = f"thumbnail:{os.path.abspath(image_path)}:{stat.st_mtime_ns}:{stat.st_size}"
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached[0].encode("ascii"), cached[1]
+
+    from PIL import Image as PILImage
     img = PILImage.open(image_path)
     img.thumbnail((10, 10))    
     buffer = BytesIO()
@@ -139,6 +404,7 @@ def create_thumbnail(image_path: str) -> Tuple[bytes, str]:
     
     # Convert bytes to string for proper JSON serialization
     encoded_bytes = base64.b64encode(buffer.getvalue())
+    cache.set(cache_key, [encoded_bytes.decode("ascii"), mime_type], THUMBNAIL_CACHE_TTL)
     return encoded_bytes, mime_type
 
 @mcp.tool()
@@ -157,6 +423,7 @@ def save_thumbnail(image_path: str, image_bytes_base64: bytes) -> str:
     Returns:
         str: A confirmation message indicating where the thumbnail was saved
     """
+    from PIL import Image as PILImage
     try:
         # Ensure directory exists
         output_dir = os.path.dirname(image_path)
@@ -191,7 +458,7 @@ def save_thumbnail(image_path: str, image_bytes_base64: bytes) -> str:
 async def generate_poem(topic: str, context: Context) -> str:
     """Generate a short poem about the given topic."""
     request_id = context.request_id
-    await context.info(f"[{request_id}] Starting processing for {topic}")
+    await client_log(context, f"[{request_id}] Starting processing for {topic}")
     # The server requests a completion from the client LLM
     response = await context.sample(
         messages=f"Write a short poem about {topic}",
@@ -304,36 +571,42 @@ Developers can start building and testing MCP connectors today. All Claude.ai pl
 Claude for Work customers can begin testing MCP servers locally, connecting Claude to internal systems and datasets. We'll soon provide developer toolkits for deploying remote production MCP servers that can serve your entire Claude for Work organization."""
 
 # Register system status with context
-@mcp.resource("system://status")
-async def get_system_status() -> dict:
+@mcp.resource("system://status", mime_type="application/json")
+async def get_system_status() -> str:
     """Report the current system status."""
     # https://github.com/modelcontextprotocol/python-sdk/issues/244
     ctx = mcp.get_context()
-    await ctx.info("Checking system status...")
+    await client_log(ctx, "Checking system status...")
     # Perform checks
-    await ctx.report_progress(1, 1) # Report completion
-    return {"status": "OK", "load": 0.5, "client": ctx.client_id}
+    await report_progress(ctx, 1, 1) # Report completion
+    return compact_json({"status": "OK", "load": round(metrics.load(), 3), "in_flight": metrics.in_flight, "client": ctx.client_id})
+
+# Register the metrics of this server process
+@mcp.resource("system://metrics", mime_type="application/json")
+def get_metrics() -> str:
+    """Per tool/resource/prompt call counts, errors and latency percentiles, upstream NWS timings, cache and connection pool statistics."""
+    return compact_json(metrics.snapshot())
 
 
 # Register a dynamic resource template for animals
-@mcp.resource("animal://{animal_name}")
-def get_animal_info(animal_name: str) -> Dict[str, Any]:
+@mcp.resource("animal://{animal_name}", mime_type="application/json")
+def get_animal_info(animal_name: str) -> str:
     """Dynamic animal information resource"""
     if animal_name in ANIMALS:
-        return ANIMALS[animal_name]
+        return compact_json(ANIMALS[animal_name])
     raise ValueError(f"Unknown animal: {animal_name}")
 
 # Register a list resource to show all available animals
-@mcp.resource("animals://list")
-def list_animals() -> Dict[str, str]:
+@mcp.resource("animals://list", mime_type="application/json")
+def list_animals() -> str:
     """List of all available animals"""
-    return {name: animal["name"] for name, animal in ANIMALS.items()}
+    return compact_json({name: animal["name"] for name, animal in ANIMALS.items()})
 
 # Register a list resource to show all available animals images
-@mcp.resource("image://list")
-def list_animals() -> Dict[str, str]:
+@mcp.resource("image://list", mime_type="application/json")
+def list_animals() -> str:
     """List of all available animals images"""
-    return {"dog": "dog.png"}
+    return compact_json({"dog": "dog.png"})
 
 # Register a dynamic resource template for images
 @mcp.resource("image://{image_name}")
@@ -382,11 +655,47 @@ def debug_session_start(error_message: str) -> list[PromptMessage]:
         PromptMessage(role="assistant", content=TextContent(type="text", text="Okay, I can help with that. Let me look into the error message you provided and list what's the possible way to fix it."))
     ]
 
+async def prometheus_metrics(request: Request) -> PlainTextResponse:
+    return PlainTextResponse(metrics.prometheus_text(), media_type="text/plain; version=0.0.4")
+
+def run_sse(host: str, port: int, prometheus: bool = False):
+    """Run the SSE transport, uvicorn's own logging setup is skipped so its loggers go through the pipeline too."""
+    import uvicorn
+    app = mcp.sse_app()
+    if prometheus:
+        app.add_route("/metrics", prometheus_metrics)
+    # SSE streams never end on their own, so bound how long a shutdown waits for them
+    uvicorn.run(RequestMiddleware(app), host=host, port=port, log_config=None, timeout_graceful_shutdown=5)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="MCP Tutorial Server")
+    parser.add_argument("--transport", choices=["stdio", "sse"], default="sse")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of SSE worker processes served behind --port, they share the SQLite cache")
+    parser.add_argument("--prometheus", action="store_true",
+                        help="Serve metrics in the Prometheus text format on GET /metrics (SSE only)")
+    # Set by the multi-worker mode when it spawns a worker
+    parser.add_argument("--worker-index", type=int, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
 if __name__ == "__main__":
     # This code only runs when the file is executed directly
-    
-    # Local STDIO
-    # mcp.run()
-
-    # SSE
-    mcp.run(transport="sse", host="127.0.0.1", port=9000)
\ No newline at end of file
+    args = parse_args()
+
+    if args.transport == "stdio":
+        # Local STDIO
+        mcp.run()
+    elif args.worker_index is not None:
+        # One worker of the multi-worker mode, the proxy routes its sessions on the message path
+        from cluster import worker_message_path
+        mcp.settings.message_path = worker_message_path(args.worker_index)
+        run_sse("127.0.0.1", args.port, args.prometheus)
+    elif args.workers > 1:
+        # Production: N worker processes behind one port
+        from cluster import run_cluster
+        run_cluster(args.workers, args.host, args.port, worker_args=["--prometheus"] if args.prometheus else [])
+    else:
+        # SSE
+        run_sse(args.host, args.port, args.prometheus)
\ No newline at end of file
@@ -0,0 +1,193 @@
+import json
+import os
+import secrets
+import time
+from pathlib import Path
+from typing import Any
+
+# Local persistence of chat sessions.
+# Every message is appended to the session's log.jsonl as it happens, so a crash loses nothing.
+# Every SNAPSHOT_EVERY messages snapshot.json is rewritten with the system message, the tool schemas,
+# the (capped) recent history and the log offset it covers. Resuming reads the snapshot and only the
+# log records after that offset, never the whole history.
+SESSION_DIR = Path(os.environ.get("MCP_SESSION_DIR", Path(__file__).parent / ".sessions"))
+SNAPSHOT_EVERY = int(os.environ.get("MCP_SNAPSHOT_EVERY", "20"))
+# Messages (besides the system message) kept in memory and sent to the model
+HISTORY_MAX_MESSAGES = int(os.environ.get("MCP_HISTORY_MAX_MESSAGES", "100"))
+
+
+class ChatSession:
+    def __init__(self, path: Path, snapshot: dict[str, Any], max_messages: int = HISTORY_MAX_MESSAGES,
+                 snapshot_every: int = SNAPSHOT_EVERY):
+        self.path = path
+        self.id = path.name
+        self.system_message: str = snapshot["system_message"]
+        self.tool_schemas: list[dict] = snapshot["tool_schemas"]
+        self.messages: list[dict] = snapshot["messages"]
+        self.seq: int = snapshot["seq"]
+        self.created: float = snapshot["created"]
+        self.max_messages = max_messages
+        self.snapshot_every = snapshot_every
+        # Binary, so tell() is the byte offset the snapshot records
+        self._log = open(path / "log.jsonl", "ab")
+        self._since_snapshot = 0
+
+    def conversation(self) -> list[dict]:
+        """Messages to send to the model, the system message plus the recent history."""
+        return [{"role": "system", "content": self.system_message}] + self.messages
+
+    def append(self, message: dict):
+        """Log a message (a plain dict) and add it to the history."""
+        self.seq += 1
+        record = {"seq": self.seq, "ts": round(time.time(), 3), "message": message}
+        self._log.write((json.dumps(record) + "\n").encode("utf-8"))
+        self._log.flush()
+        self._add(message)
+        self._since_snapshot += 1
+        if self._since_snapshot >= self.snapshot_every:
+            self.snapshot()
+
+    def _add(self, message: dict):
+        self.messages.append(message)
+        self._trim()
+
+    def _trim(self):
+        if len(self.messages) > self.max_messages:
+            # Never start on a tool result or the assistant message still waiting for its results,
+            # the history has to begin with a user message to be valid
+            users = [index for index, message in enumerate(self.messages) if message.get("role") == "user"]
+            start = len(self.messages) - self.max_messages
+            kept = [index for index in users if index >= start]
+            if kept:
+                start = kept[0]
+            elif users:
+                # The latest turn alone is over the cap, keep it whole rather than sending no history at all
+                start = users[-1]
+            else:
+                return
+            del self.messages[:start]
+
+    def _answer_pending(self) -> bool:
+        """Add an error result for every tool call without one, left behind by a crash in the middle of a turn.
+
+        The model API rejects a history with unanswered tool calls, so a session would never work again.
+        Returns whether anything was added.
+        """
+        repaired = False
+        index = 0
+        while index < len(self.messages):
+            message = self.messages[index]
+            index += 1
+            if message.get("role") != "assistant" or not message.get("tool_calls"):
+                continue
+            answered = set()
+            while index < len(self.messages) and self.messages[index].get("role") == "tool":
+                answered.add(self.messages[index].get("tool_call_id"))
+                index += 1
+            for tool_call in message["tool_calls"]:
+                if tool_call["id"] not in answered:
+                    self.messages.insert(index, {
+                        "tool_call_id": tool_call["id"],
+                        "role": "tool",
+                        "name": tool_call.get("function", {}).get("name", ""),
+                        "content": "Error: tool call interrupted",
+                    })
+                    index += 1
+                    repaired = True
+        return repaired
+
+    def snapshot(self):
+        """Write the compacted state, atomically so a crash leaves the previous snapshot intact."""
+        snapshot = {
+            "system_message": self.system_message,
+            "tool_schemas": self.tool_schemas,
+            "messages": self.messages,
+            "seq": self.seq,
+            "log_offset": self._log.tell(),
+            "created": self.created,
+            "updated": time.time(),
+        }
+        tmp_path = self.path / "snapshot.json.tmp"
+        tmp_path.write_text(json.dumps(snapshot), encoding="utf-8")
+        os.replace(tmp_path, self.path / "snapshot.json")
+        self._since_snapshot = 0
+
+    def close(self):
+        if not self._log.closed:
+            if self._since_snapshot:
+                self.snapshot()
+            self._log.close()
+
+
+class SessionStore:
+    def __init__(self, root: Path | str = SESSION_DIR, max_messages: int = HISTORY_MAX_MESSAGES,
+                 snapshot_every: int = SNAPSHOT_EVERY):
+        self.root = Path(root)
+        self.max_messages = max_messages
+        self.snapshot_every = snapshot_every
+
+    def create(self, system_message: str, tool_schemas: list[dict]) -> ChatSession:
+        # Sortable by start time, the random part keeps two sessions started in the same second apart
+        path = self.root / f"{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(3)}"
+        path.mkdir(parents=True)
+        now = time.time()
+        session = ChatSession(path, {"system_message": system_message, "tool_schemas": tool_schemas, "messages": [],
+                                     "seq": 0, "created": now}, self.max_messages, self.snapshot_every)
+        session.snapshot()
+        return session
+
+    def resume(self, session_id: str | None = None) -> ChatSession:
+        """Reload a session (the latest one by default) from its snapshot and the log records after it."""
+        if session_id is None:
+            sessions = self.list()
+            if not sessions:
+                raise ValueError("No saved sessions")
+            session_id = sessions[-1]["id"]
+        path = self.root / session_id
+        snapshot_path = path / "snapshot.json"
+        if not snapshot_path.exists():
+            raise ValueError(f"Unknown session: {session_id}")
+        snapshot = json.loads(snapshot_path.read_text(encoding="utf-8"))
+
+        log_path = path / "log.jsonl"
+        tail = []
+        with open(log_path, "rb") as log:
+            log.seek(snapshot["log_offset"])
+            good_offset = snapshot["log_offset"]
+            for line in log:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("Incomplete record")
+                    record = json.loads(line)
+                except ValueError:
+                    # A record cut off by a crash, everything before it is intact
+                    break
+                tail.append(record)
+                good_offset += len(line)
+        if good_offset < log_path.stat().st_size:
+            # Drop the partial record so new ones do not get appended to it
+            os.truncate(log_path, good_offset)
+
+        session = ChatSession(path, snapshot, self.max_messages, self.snapshot_every)
+        # The cap may have been lowered since the snapshot was written
+        session._trim()
+        for record in tail:
+            if record["seq"] > session.seq:
+                session.seq = record["seq"]
+                session._add(record["message"])
+        # Added to the history only, the snapshot keeps them
+        if session._answer_pending() or tail:
+            session.snapshot()
+        return session
+
+    def list(self) -> list[dict[str, Any]]:
+        """Saved sessions, oldest first."""
+        sessions = []
+        if not self.root.exists():
+            return sessions
+        for path in sorted(self.root.iterdir()):
+            snapshot_path = path / "snapshot.json"
+            if snapshot_path.exists():
+                log_size = (path / "log.jsonl").stat().st_size if (path / "log.jsonl").exists() else 0
+                sessions.append({"id": path.name, "updated": snapshot_path.stat().st_mtime, "log_bytes": log_size})
+        return sessions